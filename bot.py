@@ -1,31 +1,73 @@
+import asyncio
+import io
+import json
 import logging
 import os
 import platform
-import re
 import sys
 import traceback
-from copy import copy
 from datetime import datetime
 from datetime import timezone
-from logging.handlers import RotatingFileHandler
 from typing import Any
 from typing import Callable
 
 import aiohttp  # https://pypi.org/project/aiohttp/
 import discord  # https://pypi.org/project/discord.py/
+from aiohttp import web  # https://pypi.org/project/aiohttp/
 from discord import app_commands  # https://pypi.org/project/discord.py/
 from discord.ext import commands  # https://pypi.org/project/discord.py/
 
+from cogs.utils.common import build_prefix_table
 from cogs.utils.common import get_prefixes_list
 from cogs.utils.common import get_prefixes_message
+from cogs.utils.errors import ErrorAggregator
+from cogs.utils.http import create_session
+from cogs.utils.http import PoolStats
 from cogs.utils.io import dev_mail
+from cogs.utils.lag import LoopLagMonitor
+from cogs.utils.logs import BatchRotatingFileHandler
+from cogs.utils.logs import BatchingQueueListener
+from cogs.utils.logs import create_queue_logger
+from cogs.utils.logs import JsonLinesFormatter
+from cogs.utils.metrics import Metrics
+from cogs.utils.metrics import start_metrics_server
+from cogs.utils.outbox import Outbox
+from cogs.utils.quotas import QuotaService
+from cogs.utils.resolver import EntityResolver
+from cogs.utils.shards import get_cluster_shard_ids
+from cogs.utils.tag_index import TagIndex
+from cogs.utils.tag_views import TagViewCounter
+from cogs.utils.time import TimezoneCache
+from cogs.utils.tokens import TokenScanner
+from cogs.utils.workers import ProcessPool
+from cogs.utils.writes import WriteBuffer
 
 
 class DevSettings:
     def __init__(self) -> None:
         self.version: str = "v0.1.5"
         self.logs_folder_path: str = os.path.join(os.path.dirname(__file__), "logs")
-        self.log_file_path: str = os.path.join(self.logs_folder_path, "bot.log")
+        self.cluster_count: int = int(os.environ.get("CLUSTER_COUNT", "1"))
+        self.cluster_id: int = int(os.environ.get("CLUSTER_ID", "0"))
+        self.shard_count: int | None = None
+        if shard_count := os.environ.get("SHARD_COUNT"):
+            self.shard_count = int(shard_count)
+        self.shard_ids: list[int] | None = None
+        log_file_name = "bot"
+        if self.cluster_count > 1:
+            if self.shard_count is None:
+                raise ValueError("SHARD_COUNT is required when CLUSTER_COUNT > 1")
+            self.shard_ids = get_cluster_shard_ids(
+                self.shard_count, self.cluster_count, self.cluster_id
+            )
+            log_file_name = f"bot-cluster-{self.cluster_id}"
+        self.log_file_path: str = os.path.join(
+            self.logs_folder_path, f"{log_file_name}.log"
+        )
+        self.json_log_file_path: str = os.path.join(
+            self.logs_folder_path, f"{log_file_name}.jsonl"
+        )
+        self.log_json: bool = os.environ.get("LOG_JSON", "False").lower() == "true"
         self.alt_github_name: str | None = os.environ.get(
             "ALTERNATE_GITHUB_ACCOUNT_NAME"
         )
@@ -56,16 +98,70 @@ class DevSettings:
         for role_id in os.environ.get("MEMBERSHIP_ROLE_IDS", "").split(","):
             if role_id:
                 self.membership_role_ids.append(int(role_id))
+        self.http_pool_limit: int = int(os.environ.get("HTTP_POOL_LIMIT", "100"))
+        self.http_pool_limit_per_host: int = int(
+            os.environ.get("HTTP_POOL_LIMIT_PER_HOST", "10")
+        )
+        self.http_keepalive_timeout: float = float(
+            os.environ.get("HTTP_KEEPALIVE_TIMEOUT", "30")
+        )
+        self.http_dns_cache_ttl: int = int(os.environ.get("HTTP_DNS_CACHE_TTL", "300"))
+        self.metrics_host: str = os.environ.get("METRICS_HOST", "127.0.0.1")
+        self.metrics_port: int | None = None
+        if metrics_port := os.environ.get("METRICS_PORT"):
+            # Each cluster serves its metrics on its own port.
+            self.metrics_port = int(metrics_port) + self.cluster_id
+        self.loop_lag_threshold: float = float(
+            os.environ.get("LOOP_LAG_THRESHOLD", "0.1")
+        )
+        self.member_cache: str = os.environ.get("MEMBER_CACHE", "lazy").lower()
+        if self.member_cache not in ("lazy", "full"):
+            raise ValueError('MEMBER_CACHE must be "lazy" or "full"')
+        self.message_cache_size: int | None = int(
+            os.environ.get("MESSAGE_CACHE_SIZE", "1000")
+        )
+        if not self.message_cache_size:
+            self.message_cache_size = None  # This disables the message cache.
+        self.error_digest_interval: float = float(
+            os.environ.get("ERROR_DIGEST_INTERVAL", "300")
+        )
+        self.outbox_concurrency: int = int(os.environ.get("OUTBOX_CONCURRENCY", "10"))
+        self.outbox_global_rate: float = float(
+            os.environ.get("OUTBOX_GLOBAL_RATE", "25")
+        )
+        self.outbox_channel_interval: float = float(
+            os.environ.get("OUTBOX_CHANNEL_INTERVAL", "1")
+        )
+        self.process_pool_size: int = int(os.environ.get("PROCESS_POOL_SIZE", "2"))
+        self.process_pool_timeout: float = float(
+            os.environ.get("PROCESS_POOL_TIMEOUT", "10")
+        )
 
 
-class Bot(commands.Bot):
+class Bot(commands.AutoShardedBot):
     def __init__(self) -> None:
         self.dev_settings = DevSettings()
         intents = discord.Intents.default()
         intents.members = True
         intents.message_content = True
         intents.presences = False
-        super().__init__(intents=intents, command_prefix=self.get_command_prefixes)
+        if self.dev_settings.member_cache == "full":
+            chunk_guilds_at_startup = True
+            member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        else:
+            # Only the support server is chunked at startup (in `on_connect`). Other
+            # servers are chunked the first time a command needs their member list.
+            chunk_guilds_at_startup = False
+            member_cache_flags = discord.MemberCacheFlags(voice=False, joined=True)
+        super().__init__(
+            intents=intents,
+            command_prefix=self.get_command_prefixes,
+            shard_count=self.dev_settings.shard_count,
+            shard_ids=self.dev_settings.shard_ids,
+            chunk_guilds_at_startup=chunk_guilds_at_startup,
+            member_cache_flags=member_cache_flags,
+            max_messages=self.dev_settings.message_cache_size,
+        )
         self.add_check(self.check_global_cooldown, call_once=True)
         self.global_cd = commands.CooldownMapping.from_cooldown(
             1, 5, commands.BucketType.user
@@ -74,14 +170,61 @@ class Bot(commands.Bot):
         self.app_info: commands.Bot.AppInfo = None
         self.owner_id: int | None = None
         self.launch_time = datetime.now(timezone.utc)
-        connector = aiohttp.TCPConnector(force_close=True)
-        self.session = aiohttp.ClientSession(connector=connector)
+        self.http_pool_stats = PoolStats()
+        self.session = create_session(self.dev_settings, self.http_pool_stats)
         self.custom_prefixes: dict[int, list[str]] = dict()
         self.removed_default_prefixes: dict[int, list[str]] = dict()
+        self.prefix_tables: dict[int, tuple[str, ...]] = dict()
+        self.default_prefix_table: tuple[str, ...] = build_prefix_table(
+            self.dev_settings.default_bot_prefixes, None, None
+        )
+        self.dm_prefix_table: tuple[str, ...] = (*self.default_prefix_table, "")
+        self.mention_prefixes: tuple[str, ...] = tuple()
         self.logger: logging.Logger | None = None
+        self.log_listener: BatchingQueueListener | None = None
         self.previous_command_ctxs: list[commands.Context] = []
         self.command_use_count = 0
-        self.error_is_reported = False
+        self.metrics = Metrics()
+        self.metrics_runner: web.AppRunner | None = None
+        self.lag_monitor = LoopLagMonitor(
+            threshold=self.dev_settings.loop_lag_threshold,
+            get_running_commands=self.get_running_command_names,
+        )
+        self.metrics.add_collector(self.lag_monitor.render_prometheus)
+        self.resolver = EntityResolver(self)
+        self.metrics.add_collector(self.resolver.render_prometheus)
+        self.outbox = Outbox(
+            self,
+            concurrency=self.dev_settings.outbox_concurrency,
+            global_rate=self.dev_settings.outbox_global_rate,
+            channel_interval=self.dev_settings.outbox_channel_interval,
+        )
+        self.metrics.add_collector(self.outbox.render_prometheus)
+        self.outbox_task: asyncio.Task | None = None
+        self.quotas = QuotaService(self)
+        self.metrics.add_collector(self.quotas.render_prometheus)
+        self.write_buffer = WriteBuffer(self)
+        self.metrics.add_collector(self.write_buffer.render_prometheus)
+        self.write_buffer_task: asyncio.Task | None = None
+        self.timezone_cache = TimezoneCache()
+        self.metrics.add_collector(self.timezone_cache.render_prometheus)
+        self.tag_index = TagIndex()
+        self.metrics.add_collector(self.tag_index.render_prometheus)
+        self.tag_views = TagViewCounter(self)
+        self.metrics.add_collector(self.tag_views.render_prometheus)
+        self.tag_views_task: asyncio.Task | None = None
+        self.process_pool = ProcessPool(
+            max_workers=self.dev_settings.process_pool_size,
+            timeout=self.dev_settings.process_pool_timeout,
+        )
+        self.metrics.add_collector(self.process_pool.render_prometheus)
+        self.chunk_tasks: dict[int, asyncio.Task] = dict()
+        self.error_aggregator = ErrorAggregator(
+            self.send_error_digest,
+            digest_interval=self.dev_settings.error_digest_interval,
+        )
+        self.error_digest_task: asyncio.Task | None = None
+        self.token_scanner = TokenScanner(self.publish_tokens)
 
     async def setup_hook(self) -> None:
         default_extensions = [
@@ -98,6 +241,17 @@ class Bot(commands.Bot):
         ]
         for extension in default_extensions:
             await self.load_extension(extension)
+        self.lag_monitor.start()
+        self.error_digest_task = self.loop.create_task(self.error_aggregator.run())
+        self.outbox_task = self.loop.create_task(self.outbox.run())
+        self.write_buffer_task = self.loop.create_task(self.write_buffer.run())
+        self.tag_views_task = self.loop.create_task(self.tag_views.run())
+        if self.dev_settings.metrics_port is not None:
+            self.metrics_runner = await start_metrics_server(
+                self.metrics,
+                self.dev_settings.metrics_host,
+                self.dev_settings.metrics_port,
+            )
 
     def get_command_prefixes(self, bot, message: discord.Message) -> list[str]:
         """Returns the bot's server-aware unrendered command prefixes
@@ -107,37 +261,141 @@ class Bot(commands.Bot):
         be used when initializing the bot; to get unrendered prefixes elsewhere, it may
         be safer to use `bot.command_prefix(bot, message)`.
         """
-        prefixes = copy(self.dev_settings.default_bot_prefixes)
         if not message.guild:
-            prefixes.append("")
+            table = self.dm_prefix_table
         else:
-            try:
-                removed_default_prefixes = copy(
-                    self.removed_default_prefixes[message.guild.id]
-                )
-                if removed_default_prefixes is not None:
-                    for p in removed_default_prefixes:
-                        prefixes.remove(p)
-            except KeyError:
-                pass
-            try:
-                custom_prefixes = copy(self.custom_prefixes[message.guild.id])
-                if custom_prefixes is not None:
-                    prefixes.extend(custom_prefixes)
-            except KeyError:
-                pass
-        if message.guild and "" in prefixes:
-            prefixes.remove("")
-        return commands.when_mentioned_or(*prefixes)(bot, message)
+            table = self.get_prefix_table(message.guild.id)
+        return [*self.get_mention_prefixes(), *table]
+
+    def get_prefix_table(self, server_id: int) -> tuple[str, ...]:
+        """Returns a server's precomputed unrendered command prefixes
+
+        The table is built the first time it is needed and reused until the server's
+        prefixes change. It does not include the mention prefixes.
+        """
+        try:
+            return self.prefix_tables[server_id]
+        except KeyError:
+            pass
+        custom_prefixes = self.custom_prefixes.get(server_id)
+        removed_default_prefixes = self.removed_default_prefixes.get(server_id)
+        if custom_prefixes or removed_default_prefixes:
+            table = build_prefix_table(
+                self.dev_settings.default_bot_prefixes,
+                removed_default_prefixes,
+                custom_prefixes,
+            )
+        else:
+            table = self.default_prefix_table
+        self.prefix_tables[server_id] = table
+        return table
+
+    def invalidate_prefix_table(self, server_id: int | None = None) -> None:
+        """Discards a server's precomputed prefixes, or all servers' if no ID is given
+
+        This must be called whenever `custom_prefixes` or `removed_default_prefixes`
+        changes.
+        """
+        if server_id is None:
+            self.prefix_tables.clear()
+        else:
+            self.prefix_tables.pop(server_id, None)
+
+    def get_mention_prefixes(self) -> tuple[str, ...]:
+        """Returns the unrendered bot mention prefixes"""
+        if not self.mention_prefixes and self.user is not None:
+            self.mention_prefixes = (f"<@{self.user.id}> ", f"<@!{self.user.id}> ")
+        return self.mention_prefixes
+
+    def could_be_command(self, message: discord.Message) -> bool:
+        """Quickly says whether a message might start with a command prefix
+
+        Messages this returns False for cannot be commands, so they can be ignored
+        before any Context is created for them.
+        """
+        if not message.guild:
+            return True  # Prefixless commands are allowed in DMs.
+        content = message.content
+        return content.startswith(
+            self.get_prefix_table(message.guild.id)
+        ) or content.startswith(self.get_mention_prefixes())
+
+    async def ensure_chunked(self, server: discord.Guild) -> None:
+        """Loads a server's full member list into the cache if it is not already there
+
+        Use this before relying on `server.members`, `role.members`, or a None result
+        from `server.get_member`. Concurrent calls for the same server share one chunk
+        request.
+        """
+        if server.chunked:
+            return
+        task = self.chunk_tasks.get(server.id)
+        if task is None or task.done():
+            task = self.chunk_tasks[server.id] = asyncio.create_task(
+                server.chunk(cache=True)
+            )
+
+            def forget_task(done_task: asyncio.Task) -> None:
+                if self.chunk_tasks.get(server.id) is done_task:
+                    del self.chunk_tasks[server.id]
+
+            task.add_done_callback(forget_task)
+        await asyncio.shield(task)
+
+    def get_shard_filter(self) -> tuple[int, list[int]]:
+        """Returns the shard count and the IDs of the shards this process runs
+
+        Scheduled tasks in the database should only be run by the cluster whose shards
+        receive their server's events. Filter rows with
+        `((COALESCE(server_id, 0) >> 22) % $1) = ANY($2)` using these two values. If
+        the bot is not split into clusters, the filter matches every row.
+        """
+        if self.dev_settings.shard_ids is None:
+            return 1, [0]
+        return self.dev_settings.shard_count, self.dev_settings.shard_ids
+
+    def get_running_command_names(self) -> list[str]:
+        """Returns the names of the commands that are currently running"""
+        return [
+            command_name
+            for (_, command_name), stats in list(self.metrics.commands.items())
+            if stats.in_flight > 0
+        ]
 
     async def close(self) -> None:
         if self.logger:
             self.logger.info("Shutting down . . .")
         else:
             print("`Bot.logger` is `None` in `Bot.close`")
+        self.lag_monitor.stop()
+        if self.outbox_task is not None:
+            self.outbox_task.cancel()  # Unsent messages stay in the outbox table.
+        if self.error_digest_task is not None:
+            self.error_digest_task.cancel()
+            try:
+                await asyncio.wait_for(self.error_aggregator.flush(), timeout=10)
+            except Exception as error:
+                print(f"  Bot.close {error = }")  # noqa: E251, E202
+        if self.write_buffer_task is not None:
+            self.write_buffer_task.cancel()
+        try:
+            await asyncio.wait_for(self.write_buffer.flush(), timeout=10)
+        except Exception as error:
+            print(f"  Bot.close {error = }")  # noqa: E251, E202
+        if self.tag_views_task is not None:
+            self.tag_views_task.cancel()
+        try:
+            await asyncio.wait_for(self.tag_views.flush(), timeout=10)
+        except Exception as error:
+            print(f"  Bot.close {error = }")  # noqa: E251, E202
+        self.process_pool.kill()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
         await self.db.close()
         await self.session.close()
         await super().close()
+        if self.log_listener is not None:
+            self.log_listener.stop()  # Writes any records still in the queue.
 
     async def on_connect(self) -> None:
         # This function may be called multiple times while the bot is running, so its
@@ -150,6 +408,13 @@ class Bot(commands.Bot):
             self.logger = await self.set_up_logger()
         self.logger.info("Loading . . .")
 
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        # Dispatched when the server's data arrives at startup and when it comes back
+        # after an outage. `on_connect` is too early because the servers are not cached
+        # yet then.
+        if guild.id == self.dev_settings.support_server_id:
+            await self.ensure_chunked(guild)
+
     async def on_resumed(self) -> None:
         print("Resumed . . . ")
 
@@ -169,27 +434,38 @@ class Bot(commands.Bot):
             return
         if await self.is_only_bot_mention(message):
             await self.answer_mention(message)
-        else:
+        elif self.could_be_command(message):
             await self.process_commands(message)
 
     async def detect_token(self, message: discord.Message) -> None:
         """Detects bot tokens and warns people about them"""
-        token_regex = re.compile(
-            r"([a-zA-Z0-9]{24}\.[a-zA-Z0-9]{6}\.[a-zA-Z0-9_\-]{27}"
-            r"|mfa\.[a-zA-Z0-9_\-]{84})"
-        )
-        match = token_regex.search(message.content)
-        if match is not None:
-            await self.publish_token(match[0], message)
+        tokens: list[str] = self.token_scanner.scan(message.content)
+        if tokens:
+            await self.publish_token(tokens, message)
 
     async def publish_token(
-        self, discord_bot_token: str, message: discord.Message
+        self, discord_bot_tokens: list[str], message: discord.Message
     ) -> None:
-        """Publishes tokens in GitHub gists to invalidate them and protect bots"""
+        """Queues tokens to be published with the next batch of detected tokens"""
+        self.token_scanner.add(discord_bot_tokens, message)
+
+    async def publish_tokens(
+        self, discord_bot_tokens: list[str], messages: list[discord.Message]
+    ) -> None:
+        """Publishes tokens in one GitHub gist to invalidate them and protect bots
+
+        Each message a token was found in gets a reply once the gist is created.
+        """
         url = "https://api.github.com/gists"
-        data = (
-            '{"public":true,"files":{"discord-bot-token.txt":{"content":"%s"}}}'
-            % discord_bot_token
+        data = json.dumps(
+            {
+                "public": True,
+                "files": {
+                    "discord-bot-tokens.txt": {
+                        "content": "\n".join(discord_bot_tokens)
+                    }
+                },
+            }
         )
         auth = aiohttp.BasicAuth(
             self.dev_settings.alt_github_name,
@@ -200,12 +476,16 @@ class Bot(commands.Bot):
                 raise ValueError(
                     f"GitHub API request failed with status code {response.status}."
                 )
-        await message.reply(
-            "Bot token detected and invalidated! If the token was in use, the bot it "
-            "belonged to will need to get a new token before being able to reconnect "
-            "to Discord. For more details, see "
-            "<https://gist.github.com/beep-boop-82197842/4255864be63966b8618e332d1df30619>"  # noqa: E501
-        )
+        for message in messages:
+            try:
+                await message.reply(
+                    "Bot token detected and invalidated! If the token was in use, the"
+                    " bot it belonged to will need to get a new token before being able"
+                    " to reconnect to Discord. For more details, see "
+                    "<https://gist.github.com/beep-boop-82197842/4255864be63966b8618e332d1df30619>"  # noqa: E501
+                )
+            except discord.HTTPException:
+                pass  # The message may have been deleted already.
 
     async def is_only_bot_mention(self, message: discord.Message) -> bool:
         """Returns True if the entire message is a bot mention"""
@@ -233,8 +513,12 @@ class Bot(commands.Bot):
         )
         self.logger.info(log_message)
         self.command_use_count += 1
+        self.metrics.command_started(ctx)
         await self.save_owners_command(ctx)
 
+    async def on_command_completion(self, ctx) -> None:
+        self.metrics.command_finished(ctx, failed=False)
+
     async def save_owners_command(self, ctx) -> None:
         """Saves the owner's commands for easy reuse"""
         if ctx.author.id == self.owner_id:
@@ -262,20 +546,37 @@ class Bot(commands.Bot):
         print(message)
         if self.logger is not None:
             self.logger.error(message)
+        error = sys.exc_info()[1]
+        if error is not None:
+            self.error_aggregator.record(error, f"event `{event_method}`")
 
     async def on_command_error(self, ctx, error: commands.CommandError) -> None:
         """Handles errors from commands that are NOT app commands"""
         # if isinstance(error, commands.CommandNotFound), then ctx.command is None
-        if ctx.command is None or hasattr(ctx.command, "on_error"):
+        if ctx.command is None:
             return
-        await self.on_any_command_error(ctx.send, ctx.command.name, error)
+        self.metrics.command_finished(ctx, failed=True)
+        if hasattr(ctx.command, "on_error"):
+            return
+        context = (
+            f"[author {ctx.author.id}][server {ctx.guild and ctx.guild.id}]"
+            f" {ctx.message.content[:200]}"
+        )
+        await self.on_any_command_error(ctx.send, ctx.command.name, error, context)
 
     async def on_app_command_error(
         self, interaction: discord.Interaction, error: app_commands.AppCommandError
     ) -> None:
         """Handles errors from app commands"""
+        context = (
+            f"[author {interaction.user.id}][server {interaction.guild_id}]"
+            f" /{interaction.command.qualified_name} {interaction.namespace}"
+        )
         await self.on_any_command_error(
-            interaction.response.send_message, interaction.command.name, error
+            interaction.response.send_message,
+            interaction.command.name,
+            error,
+            context[:250],
         )
 
     async def on_any_command_error(
@@ -283,8 +584,22 @@ class Bot(commands.Bot):
         send: Callable,
         cmd_name: str,
         error: app_commands.AppCommandError | commands.CommandError,
+        context: str = "",
     ) -> None:
-        """Handles errors from both app commands and other commands"""
+        """Handles errors from both app commands and other commands
+
+        Parameters
+        ----------
+        send : Callable
+            A function for responding to the command's user.
+        cmd_name : str
+            The name of the command that raised the error.
+        error : app_commands.AppCommandError | commands.CommandError
+            The error.
+        context : str
+            Who used the command, where, and with what input. This is included in the
+            owner's error digest.
+        """
         if isinstance(error, commands.CommandInvokeError):
             # All errors from command invocations are temporarily wrapped in
             # commands.CommandInvokeError
@@ -323,10 +638,10 @@ class Bot(commands.Bot):
                 f" work: {perms_needed}. Permissions can be managed in the server's"
                 " settings."
             )
-            await dev_mail(
-                self,
-                "The invite link may need to be updated with more permission(s):"
-                f" {perms_needed}",
+            self.error_aggregator.record(
+                error,
+                f"command `{cmd_name}` {context}: the invite link may need to be"
+                f" updated with more permission(s): {perms_needed}",
             )
         elif isinstance(error, commands.NoPrivateMessage):
             await send("This command cannot be used in private messages.")
@@ -350,21 +665,7 @@ class Bot(commands.Bot):
             traceback.print_exception(
                 type(error), error, error.__traceback__, file=sys.stderr
             )
-            if not self.error_is_reported:
-                if self.logger is None:
-                    await dev_mail(
-                        self,
-                        "".join(
-                            (
-                                "I encountered an error, but the logger is None so it ",
-                                "could not be logged. Here is the error:\n",
-                                message,
-                            )
-                        ),
-                    )
-                elif self.logger.level <= logging.ERROR:
-                    await dev_mail(self, "I encountered and logged an error")
-                self.error_is_reported = True
+            self.error_aggregator.record(error, f"command `{cmd_name}` {context}")
             if not self.dev_settings.support_server_link:
                 await send(
                     "I encountered an error and notified my developer.",
@@ -378,6 +679,20 @@ class Bot(commands.Bot):
                     ephemeral=True,
                 )
 
+    async def send_error_digest(self, summary: str, details: str) -> None:
+        """Sends the owner one message with a digest of recent errors
+
+        The summary is shown in an embed and the full details, including tracebacks,
+        are attached as a file.
+        """
+        if len(summary) > 4000:
+            summary = summary[:4000] + "\n. . ."
+        with io.BytesIO(details.encode()) as binary_stream:
+            discord_file = discord.File(binary_stream, "errors.txt")
+            await dev_mail(
+                self, summary, file=discord_file, embed_title="error digest"
+            )
+
     async def on_guild_join(self, guild: discord.Guild) -> None:
         message = (
             f"I've joined a new server called `{guild.name}`!\nI am now in "
@@ -403,17 +718,21 @@ class Bot(commands.Bot):
         return True
 
     async def set_up_logger(self) -> logging.Logger:
-        """Sets up a logger for the bot"""
+        """Sets up a logger for the bot
+
+        Log records are put in a queue and written to files by a background thread, so
+        logging never blocks the event loop on disk writes or log rotation.
+        """
         # Discord logging guide:
         # https://discordpy.readthedocs.io/en/stable/logging.html
         # Python's intro to logging:
         # https://docs.python.org/3/howto/logging.html#logging-basic-tutorial
         # Documentation for RotatingFileHandler:
         # https://docs.python.org/3/library/logging.handlers.html?#logging.handlers.RotatingFileHandler  # noqa: E501
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.DEBUG)
+        # Documentation for QueueHandler and QueueListener:
+        # https://docs.python.org/3/library/logging.handlers.html#queuehandler
         os.makedirs(self.dev_settings.logs_folder_path, exist_ok=True)
-        handler = RotatingFileHandler(
+        handler = BatchRotatingFileHandler(
             filename=self.dev_settings.log_file_path,
             encoding="utf-8",
             mode="a",
@@ -424,5 +743,17 @@ class Bot(commands.Bot):
             "{asctime}[{levelname}]{message}", datefmt="%Y-%m-%d %H:%M:%S", style="{"
         )
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        handlers: list[logging.Handler] = [handler]
+        if self.dev_settings.log_json:
+            json_handler = BatchRotatingFileHandler(
+                filename=self.dev_settings.json_log_file_path,
+                encoding="utf-8",
+                mode="a",
+                maxBytes=1000000,
+                backupCount=10,
+            )
+            json_handler.setFormatter(JsonLinesFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z"))
+            handlers.append(json_handler)
+        logger, self.log_listener = create_queue_logger(__name__, *handlers)
+        logger.setLevel(logging.DEBUG)
         return logger
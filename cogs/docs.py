@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any
 
 import asyncpg  # https://pypi.org/project/asyncpg/
@@ -16,20 +17,8 @@ class Docs(commands.Cog):
         self._task = bot.loop.create_task(self.load_docs_urls())
         self.docs_urls: dict[int, str] = dict()  # Server IDs and URLs.
 
-    async def create_table_if_not_exists(self) -> None:
-        await self.bot.db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS docs (
-                id SERIAL PRIMARY KEY,
-                server_id BIGINT UNIQUE,
-                url TEXT NOT NULL
-            );
-            """
-        )
-
     async def load_docs_urls(self):
         await self.bot.wait_until_ready()
-        await self.create_table_if_not_exists()
         try:
             records = await self.bot.db.fetch(
                 """
@@ -198,30 +187,47 @@ class Docs(commands.Cog):
     async def parse_search_results(
         self, json_text: dict[str, Any], language: str | None = None
     ) -> list[str]:
-        """Formats doc search results for easy pagination"""
-        result_pages = []
-        for r in json_text["results"]:
-            if language and language != r["path"][1:3]:
-                continue
-            results = ""
-            title = r["title"]
-            results_url = r["domain"] + r["path"]
-            results += f"**[{title}]({results_url})**\n"
-            for block in r["blocks"]:
-                try:
-                    section_title = f'**{block["title"]}**\n'
-                except KeyError:
-                    section_title = ""
-                results += section_title
-                for html_content in block["highlights"]["content"]:
-                    # Convert the content from HTML to text.
-                    soup = BeautifulSoup(html_content, features="lxml")
-                    # If the external C dependency lxml cannot be used, other options
-                    # are available here: https://www.crummy.com/software/BeautifulSoup/bs4/doc/#installing-a-parser  # noqa: E501
-                    content = soup.get_text()
-                    results += f"• {content}\n"
-            result_pages.append(results)
-        return result_pages
+        """Formats doc search results for easy pagination
+
+        The HTML parsing is done in the bot's process pool.
+        """
+        try:
+            return await self.bot.process_pool.run(
+                format_search_results, json_text, language
+            )
+        except asyncio.TimeoutError:
+            raise commands.UserInputError(
+                "The search results took too long to read. Please try again."
+            )
+
+
+def format_search_results(
+    json_text: dict[str, Any], language: str | None = None
+) -> list[str]:
+    """Converts doc search results from HTML to paginator entries"""
+    result_pages = []
+    for r in json_text["results"]:
+        if language and language != r["path"][1:3]:
+            continue
+        results = ""
+        title = r["title"]
+        results_url = r["domain"] + r["path"]
+        results += f"**[{title}]({results_url})**\n"
+        for block in r["blocks"]:
+            try:
+                section_title = f'**{block["title"]}**\n'
+            except KeyError:
+                section_title = ""
+            results += section_title
+            for html_content in block["highlights"]["content"]:
+                # Convert the content from HTML to text.
+                soup = BeautifulSoup(html_content, features="lxml")
+                # If the external C dependency lxml cannot be used, other options are
+                # available here: https://www.crummy.com/software/BeautifulSoup/bs4/doc/#installing-a-parser  # noqa: E501
+                content = soup.get_text()
+                results += f"• {content}\n"
+        result_pages.append(results)
+    return result_pages
 
 
 async def setup(bot):
@@ -12,6 +12,7 @@ from discord.ext import commands  # https://pypi.org/project/discord.py/
 from cogs.utils.common import get_bot_invite_link
 from cogs.utils.common import get_prefixes_list
 from cogs.utils.common import get_prefixes_message
+from cogs.utils.common import plural
 from cogs.utils.paginator import Paginator
 from cogs.utils.time import create_long_datetime_stamp
 from cogs.utils.time import create_relative_timestamp
@@ -258,7 +259,7 @@ class Info(commands.Cog):
             name="stats",
             value=dedent(
                 f"""\
-                websocket latency: {self.bot.latency * 1000:.2f} ms
+                average websocket latency: {self.bot.latency * 1000:.2f} ms
                 uptime: {await self.get_uptime()}
                 servers: {len(self.bot.guilds)}
                 users: {len(self.bot.users)}
@@ -269,8 +270,31 @@ class Info(commands.Cog):
                 """
             ),
         )
+        embed.add_field(name="shards", value=self.describe_shards(), inline=False)
         await ctx.send(embed=embed)
 
+    def describe_shards(self) -> str:
+        """Describes the latency and server count of each shard this process runs"""
+        server_counts: dict[int, int] = dict()
+        for server in self.bot.guilds:
+            server_counts[server.shard_id] = server_counts.get(server.shard_id, 0) + 1
+        dev_settings = self.bot.dev_settings
+        lines = []
+        if dev_settings.cluster_count > 1:
+            lines.append(
+                f"cluster {dev_settings.cluster_id} of {dev_settings.cluster_count},"
+                f" {self.bot.shard_count} shards in total"
+            )
+        latencies = sorted(self.bot.latencies)
+        for shard_id, latency in latencies[:20]:
+            lines.append(
+                f"shard {shard_id}: {latency * 1000:.2f} ms,"
+                f" {plural(server_counts.get(shard_id, 0), 'server||s')}"
+            )
+        if len(latencies) > 20:
+            lines.append(f"and {len(latencies) - 20} more shards")
+        return "\n".join(lines) or "no shards connected"
+
     async def count_available_cmds(self, ctx) -> int:
         """Counts the commands that ctx.author can use"""
         count = 0
@@ -385,7 +409,7 @@ class Info(commands.Cog):
     async def about(self, ctx) -> None:
         """Shows general info about this bot"""
         embed = discord.Embed()
-        owner = self.bot.get_user(self.bot.owner_id)
+        owner = await self.bot.resolver.get_user(self.bot.owner_id)
         prefixes: list[str] = await get_prefixes_list(self.bot, ctx.message)
         shortest_nonslash_prefix = None
         for p in prefixes:
@@ -481,6 +505,7 @@ class Info(commands.Cog):
         if ctx.guild.unavailable:
             raise commands.UserInputError("The server's data is unavailable.")
         server = self.bot.get_guild(ctx.guild.id)
+        await self.bot.ensure_chunked(server)
         bot_count = await self.get_bot_count(server)
         cat_count = len(server.categories)
         created = await create_relative_timestamp(server.created_at)
@@ -619,6 +644,7 @@ class Info(commands.Cog):
             The role to view info about.
         """
         managing_bot = None
+        await self.bot.ensure_chunked(ctx.guild)
         creation_timestamp = await create_relative_timestamp(role.created_at)
         if role.tags is not None:
             if role.tags.bot_id is not None:
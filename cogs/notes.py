@@ -1,3 +1,4 @@
+import re
 from datetime import datetime
 from datetime import timezone
 
@@ -18,26 +19,16 @@ class Notes(commands.Cog):
 
     def __init__(self, bot) -> None:
         self.bot = bot
-        self._task = bot.loop.create_task(self.create_table_if_not_exists())
         self.note_ownership_limit = 5
-
-    async def create_table_if_not_exists(self) -> None:
-        await self.bot.wait_until_ready()
-        await self.bot.db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS notes (
-                author_id BIGINT PRIMARY KEY,
-                contents VARCHAR(500)[],
-                jump_urls TEXT[],  -- The URLs to the messages that created the notes.
-                -- This array is parallel to the contents array.
-                last_viewed_at TIMESTAMPTZ NOT NULL
-            );
+        self.bot.quotas.register("notes", self.count_users_notes)
+        self.bot.write_buffer.register(
+            "notes_last_viewed_at",
             """
+            UPDATE notes
+            SET last_viewed_at = $2
+            WHERE author_id = $1;
+            """,
         )
-        # Discord embed descriptions have a character limit of 4096 characters.
-        # Each note has a 500 character limit.
-        # The paginator in the notes command allows 7 notes in each embed.
-        # 7 * 500 = 3500, so there's some extra space for indexes, URLs, etc.
 
     @commands.hybrid_command(aliases=["n", "todo"])
     async def note(self, ctx, *, text: str):
@@ -57,23 +48,15 @@ class Notes(commands.Cog):
                 "Error: each note has a 500 character limit. This text is"
                 f" {len(text)-500} characters over the limit."  # noqa: E226
             )
-        try:
-            _notes, jump_urls = await self.fetch_notes(ctx)
-        except commands.BadArgument:
-            _notes = []
-            jump_urls = []
-        _notes.append(text)
-        if not ctx.interaction:
-            jump_urls.append(ctx.message.jump_url)
-        else:
-            jump_urls.append("")
-        await self.save_notes(ctx, _notes, jump_urls)
+        jump_url = "" if ctx.interaction else ctx.message.jump_url
+        index = await self.add_note(ctx.author.id, text, jump_url)
+        self.bot.quotas.set_count("notes", ctx.author.id, index)
         if ctx.interaction:
             await ctx.send(
-                f"New note saved with an index of {len(_notes)}: {text}", ephemeral=True
+                f"New note saved with an index of {index}: {text}", ephemeral=True
             )
         else:
-            await ctx.send(f"New note saved with an index of {len(_notes)}")
+            await ctx.send(f"New note saved with an index of {index}")
 
     @commands.hybrid_command(
         aliases=[
@@ -92,10 +75,7 @@ class Notes(commands.Cog):
         """Shows your current notes"""
         _notes, jump_urls = await self.fetch_notes(ctx)
         for i, n in enumerate(_notes):
-            if jump_urls[i]:
-                _notes[i] = f"[**{i+1}**.]({jump_urls[i]}) {n}"  # noqa: E226
-            else:
-                _notes[i] = f"**{i+1}**. {n}"  # noqa: E226
+            _notes[i] = await self.format_note(i + 1, n, jump_urls[i])
         paginator = Paginator(
             title=f"{ctx.author.display_name}'s notes",
             entries=_notes,
@@ -104,6 +84,97 @@ class Notes(commands.Cog):
         )
         await paginator.run(ctx)
 
+    @commands.hybrid_command(
+        name="search-notes",
+        aliases=["fn", "find-notes", "notes-search", "searchnotes", "findnotes"],
+    )
+    async def search_notes(self, ctx, *, query: str):
+        """Searches your notes and shows the best matches first
+
+        You can put phrases in double quotes, use `or` between alternatives, and put
+        `-` before words to exclude.
+
+        Parameters
+        ----------
+        query: str
+            The words to search for.
+        """
+        records = await self.bot.db.fetch(
+            """
+            WITH matches AS (
+                SELECT position,
+                    content,
+                    jump_url,
+                    ts_rank(to_tsvector('english', content), query) AS rank
+                FROM note_rows, websearch_to_tsquery('english', $2) AS query
+                WHERE author_id = $1
+                    AND to_tsvector('english', content) @@ query
+                ORDER BY rank DESC, position
+                LIMIT 50
+            )
+            SELECT (
+                    SELECT COUNT(*)
+                    FROM note_rows
+                    WHERE author_id = $1
+                        AND position <= matches.position
+                ) AS note_index,
+                content,
+                jump_url
+            FROM matches
+            ORDER BY rank DESC, position;
+            """,
+            ctx.author.id,
+            query,
+        )
+        if not records:
+            raise commands.BadArgument("No matching notes found")
+        self.bot.write_buffer.add(
+            "notes_last_viewed_at",
+            ctx.author.id,
+            ctx.author.id,
+            datetime.now(timezone.utc),
+        )
+        entries = [
+            await self.format_note(r["note_index"], r["content"], r["jump_url"])
+            for r in records
+        ]
+        paginator = Paginator(
+            title=f"{ctx.author.display_name}'s matching notes",
+            entries=entries,
+            length=7,
+            ephemeral=True,
+        )
+        await paginator.run(ctx)
+
+    @commands.hybrid_command(
+        name="reorder-notes", aliases=["rn", "reordernotes", "notes-reorder"]
+    )
+    async def reorder_notes(self, ctx, *, indexes: str):
+        """Puts your notes in a new order
+
+        For example, `reorder-notes 3,1,2` moves your third note to the top, followed
+        by your first and second notes. If you list fewer indexes than you have notes,
+        the notes after them keep their places.
+
+        Parameters
+        ----------
+        indexes: str
+            The indexes of your notes in the order you want them, separated by commas
+            or spaces.
+        """
+        try:
+            order = [int(index) for index in re.split(r"[,\s]+", indexes.strip(", "))]
+        except ValueError:
+            raise commands.BadArgument(
+                "Please list your notes' indexes separated by commas, such as `3,1,2`"
+            )
+        if sorted(order) != list(range(1, len(order) + 1)):
+            raise commands.BadArgument(
+                "Please list each index from 1 to the highest one you use exactly once"
+            )
+        await self.move_notes(ctx.author.id, order, list(range(1, len(order) + 1)))
+        await ctx.send("Notes reordered", ephemeral=True)
+
     @commands.hybrid_command(name="edit-note", aliases=["en", "editnote"])
     async def edit_note(self, ctx, index: int, *, text: str):
         """Overwrites one of your existing notes
@@ -122,12 +193,30 @@ class Notes(commands.Cog):
                 "Each note has a 500 character limit. This note is"
                 f" {len(text)-500} characters over the limit."  # noqa: E226
             )
-        _notes, jump_urls = await self.fetch_notes(ctx)
-        await self.validate_note_indexes(_notes, i)
-        _notes[i] = text
-        if not ctx.interaction:
-            jump_urls[i] = ctx.message.jump_url
-        await self.save_notes(ctx, _notes, jump_urls)
+        await self.validate_note_indexes(i)
+        jump_url = None if ctx.interaction else ctx.message.jump_url
+        note_id = await self.bot.db.fetchval(
+            """
+            UPDATE note_rows
+            SET content = $3,
+                jump_url = COALESCE($4, jump_url)
+            WHERE id = (
+                SELECT id
+                FROM note_rows
+                WHERE author_id = $1
+                ORDER BY position
+                OFFSET $2
+                LIMIT 1
+            )
+            RETURNING id;
+            """,
+            ctx.author.id,
+            i,
+            text,
+            jump_url,
+        )
+        if note_id is None:
+            await self.raise_missing_note_error(ctx.author.id)
         await ctx.send(f"Note {index} edited", ephemeral=True)
 
     @commands.hybrid_command(
@@ -143,34 +232,26 @@ class Notes(commands.Cog):
             The index of the note to delete.
         """
         i = index - 1
-        _notes, jump_urls = await self.fetch_notes(ctx)
-        await self.validate_note_indexes(_notes, i)
-        try:
-            _notes = _notes[:i] + _notes[i + 1 :]
-            jump_urls = jump_urls[:i] + jump_urls[i + 1 :]
-        except IndexError:
-            _notes = _notes[:i]
-            jump_urls = jump_urls[:i]
-        if _notes:
-            await self.bot.db.execute(
-                """
-                UPDATE notes
-                SET contents = $1,
-                    jump_urls = $2
-                WHERE author_id = $3;
-                """,
-                _notes,
-                jump_urls,
-                ctx.author.id,
-            )
-        else:
-            await self.bot.db.execute(
-                """
-                DELETE FROM notes
-                WHERE author_id = $1;
-                """,
-                ctx.author.id,
+        await self.validate_note_indexes(i)
+        note_id = await self.bot.db.fetchval(
+            """
+            DELETE FROM note_rows
+            WHERE id = (
+                SELECT id
+                FROM note_rows
+                WHERE author_id = $1
+                ORDER BY position
+                OFFSET $2
+                LIMIT 1
             )
+            RETURNING id;
+            """,
+            ctx.author.id,
+            i,
+        )
+        if note_id is None:
+            await self.raise_missing_note_error(ctx.author.id)
+        self.bot.quotas.adjust("notes", ctx.author.id, -1)
         await ctx.send(f"Deleted note {index}", ephemeral=True)
 
     @commands.hybrid_command(name="swap-notes", aliases=["sn", "swapnotes"])
@@ -184,13 +265,9 @@ class Notes(commands.Cog):
         index_2: int
             The index of another note to swap.
         """
-        i = index_1 - 1
-        j = index_2 - 1
-        n, urls = await self.fetch_notes(ctx)
-        await self.validate_note_indexes(n, i, j)
-        await self._swap_notes(n, urls, i, j)
-        await self.save_notes(ctx, n, urls)
-        await ctx.send(f"Notes {i+1} and {j+1} swapped", ephemeral=True)  # noqa: E226
+        await self.validate_note_indexes(index_1 - 1, index_2 - 1)
+        await self.move_notes(ctx.author.id, [index_1, index_2], [index_2, index_1])
+        await ctx.send(f"Notes {index_1} and {index_2} swapped", ephemeral=True)
 
     @commands.hybrid_command(
         name="up-note", aliases=["un", "nu", "upnote", "note-up", "noteup"]
@@ -203,8 +280,9 @@ class Notes(commands.Cog):
         index: int
             The index of one of your notes to move up in the list of notes.
         """
-        swap_command = self.bot.get_command("swap-notes")
-        await ctx.invoke(swap_command, index_1=index - 1, index_2=index)
+        await self.validate_note_indexes(index - 2, index - 1)
+        await self.move_notes(ctx.author.id, [index - 1, index], [index, index - 1])
+        await ctx.send(f"Note {index} moved up", ephemeral=True)
 
     @commands.hybrid_command(
         name="down-note", aliases=["dn", "nd", "downnote", "note-down", "notedown"]
@@ -217,8 +295,9 @@ class Notes(commands.Cog):
         index: int
             The index of one of your notes to move down in the list of notes.
         """
-        swap_command = self.bot.get_command("swap-notes")
-        await ctx.invoke(swap_command, index_1=index, index_2=index + 1)
+        await self.validate_note_indexes(index - 1, index)
+        await self.move_notes(ctx.author.id, [index, index + 1], [index + 1, index])
+        await ctx.send(f"Note {index} moved down", ephemeral=True)
 
     @commands.hybrid_command(
         name="top-note", aliases=["tn", "nt", "topnote", "note-top", "notetop"]
@@ -231,8 +310,9 @@ class Notes(commands.Cog):
         index: int
             The index of one of your notes to the top of the list of notes.
         """
-        swap_command = self.bot.get_command("swap-notes")
-        await ctx.invoke(swap_command, index_1=1, index_2=index)
+        await self.validate_note_indexes(0, index - 1)
+        await self.move_notes(ctx.author.id, [1, index], [index, 1])
+        await ctx.send(f"Note {index} moved to the top", ephemeral=True)
 
     @commands.hybrid_command(
         name="bottom-note",
@@ -246,65 +326,163 @@ class Notes(commands.Cog):
         index: int
             The index of one of your notes to move to the bottom of the list of notes.
         """
-        n, _ = await self.fetch_notes(ctx)
-        swap_command = self.bot.get_command("swap-notes")
-        await ctx.invoke(swap_command, index_1=index, index_2=len(n))
+        await self.validate_note_indexes(index - 1)
+        await self.move_notes(ctx.author.id, [index, -1], [-1, index])
+        await ctx.send(f"Note {index} moved to the bottom", ephemeral=True)
 
     async def fetch_notes(self, ctx) -> tuple[list[str], list[str]]:
         """Gets ctx.author's notes & jump URLs from the db, & updates last_viewed_at
 
+        The last_viewed_at update is buffered and saved later with other updates.
         Raises commands.BadArgument if ctx.author has no notes.
         """
-        record = await self.bot.db.fetchrow(
+        records = await self.bot.db.fetch(
             """
-            UPDATE notes
-            SET last_viewed_at = $1
-            WHERE author_id = $2
-            RETURNING *;
+            SELECT content, jump_url
+            FROM note_rows
+            WHERE author_id = $1
+            ORDER BY position;
             """,
-            datetime.now(timezone.utc),
             ctx.author.id,
         )
-        if record is None:
+        if not records:
             raise commands.BadArgument("You have no notes")
-        return record["contents"], record["jump_urls"]
+        self.bot.write_buffer.add(
+            "notes_last_viewed_at",
+            ctx.author.id,
+            ctx.author.id,
+            datetime.now(timezone.utc),
+        )
+        return [r["content"] for r in records], [r["jump_url"] for r in records]
+
+    async def format_note(self, index: int, content: str, jump_url: str) -> str:
+        """Formats a note for a list of notes, linking its index to its jump URL"""
+        if jump_url:
+            return f"[**{index}**.]({jump_url}) {content}"
+        return f"**{index}**. {content}"
+
+    async def add_note(self, author_id: int, text: str, jump_url: str) -> int:
+        """Saves a new note after a user's other notes; returns the note's index
 
-    async def save_notes(self, ctx, _notes, jump_urls) -> None:
-        """Saves ctx.author's notes to the db, overwriting notes they already saved"""
-        await self.bot.db.execute(
+        Also creates the user's row in the notes table if they do not have one yet.
+        """
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                # Two notes added at once by the same user would otherwise both take
+                # the position after the last one. User IDs are far larger than any
+                # other advisory lock ID the bot uses.
+                await conn.execute("SELECT pg_advisory_xact_lock($1);", author_id)
+                return await conn.fetchval(
+                    """
+                    WITH user_notes AS (
+                        SELECT COALESCE(MAX(position), 0) + 1 AS position,
+                            COUNT(*) + 1 AS note_index
+                        FROM note_rows
+                        WHERE author_id = $1
+                    ),
+                    user_row AS (
+                        INSERT INTO notes
+                        (author_id, last_viewed_at)
+                        VALUES ($1, $4)
+                        ON CONFLICT (author_id)
+                        DO NOTHING
+                    ),
+                    new_note AS (
+                        INSERT INTO note_rows
+                        (author_id, position, content, jump_url)
+                        SELECT $1, position, $2, $3
+                        FROM user_notes
+                    )
+                    SELECT note_index
+                    FROM user_notes;
+                    """,
+                    author_id,
+                    text,
+                    jump_url,
+                    datetime.now(timezone.utc),
+                )
+
+    async def move_notes(
+        self, author_id: int, from_indexes: list[int], to_indexes: list[int]
+    ) -> None:
+        """Moves any number of a user's notes at once with one statement
+
+        The note at each index in from_indexes takes the place of the note at the index
+        at the same place in to_indexes, so swapping notes 1 and 2 is `[1, 2], [2, 1]`
+        and putting the first three notes in the order 3, 1, 2 is `[3, 1, 2], [1, 2,
+        3]`. Negative indexes count from the end, so -1 is the last note. The indexes
+        must point to different notes, and the places the moved notes take must be the
+        places they leave. Otherwise, nothing is changed and commands.BadArgument is
+        raised.
+        """
+        record = await self.bot.db.fetchrow(
             """
-            INSERT INTO notes
-            (author_id, contents, jump_urls, last_viewed_at)
-            VALUES ($1, $2, $3, $4)
-            ON CONFLICT (author_id)
-            DO UPDATE
-            SET contents = $2,
-                jump_urls = $3
-            WHERE notes.author_id = $1;
+            WITH ranked_notes AS (
+                SELECT id,
+                    position,
+                    ROW_NUMBER() OVER (ORDER BY position) AS note_index,
+                    COUNT(*) OVER () AS note_count
+                FROM note_rows
+                WHERE author_id = $1
+            ),
+            moves AS (
+                SELECT moved.id,
+                    moved.position AS old_position,
+                    target.position AS new_position
+                FROM UNNEST($2::INT[], $3::INT[]) AS m (from_index, to_index)
+                JOIN ranked_notes AS moved
+                    ON moved.note_index = m.from_index
+                        OR moved.note_index = moved.note_count + 1 + m.from_index
+                JOIN ranked_notes AS target
+                    ON target.note_index = m.to_index
+                        OR target.note_index = target.note_count + 1 + m.to_index
+            ),
+            validity AS (
+                SELECT COUNT(*) = CARDINALITY($2::INT[])
+                        AND COUNT(DISTINCT id) = COUNT(*)
+                        AND ARRAY_AGG(old_position ORDER BY old_position)
+                            = ARRAY_AGG(new_position ORDER BY new_position)
+                    AS is_valid
+                FROM moves
+            ),
+            updated AS (
+                UPDATE note_rows
+                SET position = moves.new_position
+                FROM moves, validity
+                WHERE note_rows.id = moves.id
+                    AND validity.is_valid
+                    AND moves.old_position != moves.new_position
+            )
+            SELECT validity.is_valid,
+                (SELECT COUNT(*) FROM ranked_notes) AS note_count
+            FROM validity;
             """,
-            ctx.author.id,
-            _notes,
-            jump_urls,
-            datetime.now(timezone.utc),
+            author_id,
+            from_indexes,
+            to_indexes,
         )
+        if record["is_valid"]:
+            return
+        if not record["note_count"]:
+            raise commands.BadArgument("You have no notes")
+        if any(abs(i) > record["note_count"] for i in from_indexes + to_indexes):
+            raise commands.BadArgument("You do not have that many notes")
+        raise commands.BadArgument("Please use two different indexes")
 
-    async def validate_note_indexes(self, _notes: list[str], *indexes: int) -> None:
-        """Raises commands.BadArgument if an index is too low, high, or duplicated"""
+    async def validate_note_indexes(self, *indexes: int) -> None:
+        """Raises commands.BadArgument if an index is negative or duplicated"""
         for i in indexes:
             if i < 0:
                 raise commands.BadArgument("Please use a positive number")
-            elif i >= len(_notes):
-                raise commands.BadArgument("You do not have that many notes")
         if len(indexes) > 1:
             if indexes[0] == indexes[1]:
                 raise commands.BadArgument("Please use two different indexes")
 
-    async def _swap_notes(
-        self, _notes: list[str], jump_urls: list[str], index_1: int, index_2: int
-    ) -> None:
-        """Swaps two notes; assumes the indexes are valid"""
-        _notes[index_2], _notes[index_1] = _notes[index_1], _notes[index_2]
-        jump_urls[index_2], jump_urls[index_1] = jump_urls[index_1], jump_urls[index_2]
+    async def raise_missing_note_error(self, author_id: int) -> None:
+        """Raises commands.BadArgument after a note index was not found"""
+        if not await self.count_users_notes(author_id):
+            raise commands.BadArgument("You have no notes")
+        raise commands.BadArgument("You do not have that many notes")
 
     async def check_note_ownership_permission(
         self, author: discord.User | discord.Member
@@ -316,20 +494,19 @@ class Notes(commands.Cog):
             "notes",
             self.bot.dev_settings.membership_removes_note_limit,
             self.note_ownership_limit,
-            self.count_users_notes,
         )
 
     async def count_users_notes(self, author_id: int) -> int:
         """Counts a user's current notes in the database"""
-        records = await self.bot.db.fetch(
+        count = await self.bot.db.fetchval(
             """
-            SELECT *
-            FROM notes
+            SELECT COUNT(*)
+            FROM note_rows
             WHERE author_id = $1;
             """,
             author_id,
         )
-        return len(records[0]["contents"]) if records else 0
+        return count or 0
 
 
 async def setup(bot):
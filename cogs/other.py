@@ -35,18 +35,13 @@ from cogs.utils.common import block_nsfw_channels
 from cogs.utils.io import get_attachment_url
 from cogs.utils.io import safe_send
 from cogs.utils.io import unwrap_code_block
+from cogs.utils.outbox import OutboxMessage
 from cogs.utils.paginator import Paginator
 from cogs.utils.time import create_short_timestamp
 from cogs.utils.time import get_14_digit_datetime
 from cogs.utils.time import parse_time_message
 
 
-class RunningQuoteInfo:
-    def __init__(self, target_time: datetime, author_id: int) -> None:
-        self.target_time = target_time
-        self.author_id = author_id
-
-
 class MyTio(async_tio.Tio):
     async def close(_):
         pass  # prevent the bot's session from being closed
@@ -57,74 +52,196 @@ class Other(commands.Cog):
 
     def __init__(self, bot) -> None:
         self.bot = bot
-        self.running_quote_info: RunningQuoteInfo | None = None
+        self.quotes_changed = asyncio.Event()  # Set when a daily quote is created.
         self.quotes_task = self.bot.loop.create_task(self.run_daily_quotes())
 
     def cog_unload(self):
         self.quotes_task.cancel()
 
-    async def create_table_if_not_exists(self) -> None:
-        await self.bot.db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS daily_quotes (
-                author_id BIGINT PRIMARY KEY,
-                start_time TIMESTAMPTZ NOT NULL,
-                target_time TIMESTAMPTZ NOT NULL,
-                is_dm BOOLEAN NOT NULL,
-                server_id BIGINT,
-                channel_id BIGINT
-            );
-            """
-        )
-
     async def run_daily_quotes(self) -> None:
-        """A task that finds the next quote time, waits for that time, and sends"""
+        """A task that waits for the next minute with daily quotes due and sends them
+
+        All the daily quotes due in the same minute are handled together by
+        `send_due_quotes`. Creating a daily quote wakes this task up in case the new one
+        is due sooner.
+        """
         await self.bot.wait_until_ready()
         self.bot.logger.debug("quote task starting")
-        await self.create_table_if_not_exists()
-        try:
-            while not self.bot.is_closed():
-                self.bot.logger.debug("quote task getting next quote info")
-                target_time, author_id, destination = await self.get_next_quote_info()
-                if target_time is None:
-                    self.bot.logger.debug("quote task's target_time is None")
-                    self.running_quote_info = None
-                    self.quotes_task.cancel()
-                    return
-                if author_id is None:
-                    self.bot.logger.debug("quote task's author_id is None")
-                    self.running_quote_info = None
-                    self.quotes_task.cancel()
-                    return
-                self.running_quote_info = RunningQuoteInfo(target_time, author_id)
-                self.bot.logger.debug(f"quote task sleeping until {target_time}")
-                await discord.utils.sleep_until(target_time)
-                self.bot.logger.debug("quote task woke up and will now send quote")
-                try:
-                    await self.send_quote(destination, author_id)
-                    self.bot.logger.debug(
-                        "quote task sent quote and will now update the target time"
+        while not self.bot.is_closed():
+            try:
+                self.quotes_changed.clear()
+                next_time = await self.get_next_quote_time()
+                if next_time is None:
+                    self.bot.logger.debug("quote task waiting for a daily quote")
+                    await self.quotes_changed.wait()
+                    continue
+                delay = (next_time - datetime.now(timezone.utc)).total_seconds()
+                if delay > 0:
+                    self.bot.logger.debug(f"quote task sleeping until {next_time}")
+                    try:
+                        await asyncio.wait_for(self.quotes_changed.wait(), delay)
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+                await self.send_due_quotes()
+            except (ContentTypeError, json.decoder.JSONDecodeError) as error:
+                self.bot.logger.error(
+                    f"quote task inner try/except {type(error).__name__}: {error}"
+                )
+                await asyncio.sleep(30)
+            except (
+                OSError,
+                discord.ConnectionClosed,
+                asyncpg.PostgresConnectionError,
+                Exception,
+            ) as error:
+                self.bot.logger.error(
+                    f"quote task outer try/except {type(error).__name__}: {error}"
+                )
+                await asyncio.sleep(30)
+
+    async def get_next_quote_time(self) -> datetime | None:
+        """Gets the earliest target time of the daily quotes this cluster sends"""
+        shard_count, shard_ids = self.bot.get_shard_filter()
+        return await self.bot.db.fetchval(
+            """
+            SELECT MIN(target_time)
+            FROM daily_quotes
+            WHERE ((COALESCE(server_id, 0) >> 22) % $1) = ANY($2);
+            """,
+            shard_count,
+            shard_ids,
+        )
+
+    async def send_due_quotes(self) -> None:
+        """Moves every daily quote due by the end of the current minute to the outbox
+
+        The subscriptions are grouped by destination, so each channel gets one message
+        that mentions everyone who subscribed there, and one quote is fetched for the
+        whole minute. The messages are saved to the outbox, all the target times are
+        moved to the next day, and the subscriptions whose destination no longer exists
+        are deleted, all in one transaction.
+
+        May raise ContentTypeError or json.decoder.JSONDecodeError.
+        """
+        now = datetime.now(timezone.utc)
+        minute_end = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        shard_count, shard_ids = self.bot.get_shard_filter()
+        records = await self.bot.db.fetch(
+            """
+            SELECT *
+            FROM daily_quotes
+            WHERE target_time < $1
+                AND ((COALESCE(server_id, 0) >> 22) % $2) = ANY($3);
+            """,
+            minute_end,
+            shard_count,
+            shard_ids,
+        )
+        if not records:
+            return
+        groups: dict[tuple[bool, int], list[asyncpg.Record]] = dict()
+        for r in records:
+            key = (True, r["author_id"]) if r["is_dm"] else (False, r["channel_id"])
+            groups.setdefault(key, []).append(r)
+        quote, author = await self.get_quote()
+        self.bot.logger.debug(
+            f"quote task queueing {len(records)} daily quotes for {len(groups)} places"
+        )
+        results = await asyncio.gather(
+            *(self.quote_destination_exists(group[0]) for group in groups.values())
+        )
+        sent_ids: list[int] = []
+        lost_ids: list[int] = []
+        messages: list[OutboxMessage] = []
+        for group, destination_found in zip(groups.values(), results):
+            ids = sent_ids if destination_found else lost_ids
+            ids.extend(r["author_id"] for r in group)
+            if destination_found:
+                messages.extend(
+                    self.create_grouped_quote_messages(group, quote, author)
+                )
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                await self.bot.outbox.enqueue(conn, messages)
+                # Each target time moves forward by whole days until it is after this
+                # minute, so its time of day stays the same.
+                await conn.execute(
+                    """
+                    UPDATE daily_quotes
+                    SET target_time = target_time + INTERVAL '1 day'
+                        * (FLOOR(EXTRACT(EPOCH FROM $2 - target_time) / 86400) + 1)
+                    WHERE author_id = ANY($1);
+                    """,
+                    sent_ids,
+                    minute_end,
+                )
+                if lost_ids:
+                    self.bot.logger.warning(
+                        f"Deleting the daily quotes of {lost_ids} because their"
+                        " destinations were not found"
                     )
-                    await self.update_quote_target_time(target_time, author_id)
-                    self.bot.logger.debug("quote task updated the target time")
-                except (ContentTypeError, json.decoder.JSONDecodeError) as error:
-                    self.bot.logger.error(
-                        f"quote task inner try/except {type(error).__name__}: {error}"
+                    await conn.execute(
+                        """
+                        DELETE FROM daily_quotes
+                        WHERE author_id = ANY($1);
+                        """,
+                        lost_ids,
                     )
-                    await asyncio.sleep(30)
-        except (
-            OSError,
-            discord.ConnectionClosed,
-            asyncpg.PostgresConnectionError,
-            Exception,
-        ) as error:
-            self.bot.logger.error(
-                f"quote task outer try/except {type(error).__name__}: {error}"
+        self.bot.outbox.wake()
+
+    async def quote_destination_exists(self, r: asyncpg.Record) -> bool:
+        """Checks whether a daily quote subscription's destination still exists
+
+        If this cannot be checked right now, True is returned so that the outbox keeps
+        trying to send to it.
+        """
+        try:
+            if r["is_dm"]:
+                return await self.bot.resolver.get_user(r["author_id"]) is not None
+            return await self.bot.resolver.get_channel(r["channel_id"]) is not None
+        except (OSError, discord.HTTPException) as error:
+            print(f"  quote_destination_exists {error = }")  # noqa: E251, E202
+            return True
+
+    def create_grouped_quote_messages(
+        self, records: list[asyncpg.Record], quote: str, author: str
+    ) -> list[OutboxMessage]:
+        """Creates the outbox messages for the quote subscriptions sharing a place
+
+        The quote is in the first message. A channel's subscribers are mentioned in as
+        many messages as it takes to stay within Discord's 2000-character limit.
+        """
+        first = records[0]
+        contents: list[str | None] = [None]
+        if not first["is_dm"]:
+            mentions: list[str] = []
+            for r in records:
+                mention = f"<@{r['author_id']}>"
+                if mentions and len(mentions[-1]) + 1 + len(mention) <= 2000:
+                    mentions[-1] += " " + mention
+                else:
+                    mentions.append(mention)
+            contents = list(mentions)
+        embed: discord.Embed | None = discord.Embed(
+            description=f'"{quote}"\n — {author}'
+        )
+        messages: list[OutboxMessage] = []
+        for content in contents:
+            messages.append(
+                OutboxMessage(
+                    "daily_quote",
+                    min(r["target_time"] for r in records),
+                    first["is_dm"],
+                    first["author_id"] if first["is_dm"] else first["channel_id"],
+                    first["server_id"] or 0,
+                    priority=1,  # Reminders are more time-sensitive.
+                    content=content,
+                    embed=embed,
+                )
             )
-            self.quotes_task.cancel()
-            await asyncio.sleep(30)
-            self.quotes_task = self.bot.loop.create_task(self.run_daily_quotes())
-            # Could this recursion eventually cause a stack problem?
+            embed = None  # Only the first message has the quote.
+        return messages
 
     @commands.hybrid_command(
         aliases=["link", "url", "publish", "post", "paste", "mystbin"]
@@ -965,11 +1082,7 @@ class Other(commands.Cog):
         if target_time < now:
             target_time += timedelta(days=1)
         await self.save_daily_quote_to_db(ctx, now, target_time)
-        if self.running_quote_info is None:
-            self.quotes_task = self.bot.loop.create_task(self.run_daily_quotes())
-        elif target_time < self.running_quote_info.target_time:
-            self.quotes_task.cancel()
-            self.quotes_task = self.bot.loop.create_task(self.run_daily_quotes())
+        self.quotes_changed.set()
         timestamp = await create_short_timestamp(target_time)
         await ctx.send(
             f"Time set! At {timestamp} each day, I will send you a random quote."
@@ -986,12 +1099,6 @@ class Other(commands.Cog):
                 """,
                 ctx.author.id,
             )
-            if (
-                self.running_quote_info is not None
-                and ctx.author.id == self.running_quote_info.author_id  # noqa: W503
-            ):
-                self.quotes_task.cancel()
-                self.quotes_task = self.bot.loop.create_task(self.run_daily_quotes())
         except Exception as e:
             await safe_send(ctx, f"Error: {e}", protect_postgres_host=True)
         else:
@@ -1017,12 +1124,6 @@ class Other(commands.Cog):
                 member.id,
                 ctx.guild.id,
             )
-            if (
-                self.running_quote_info is not None
-                and member.id == self.running_quote_info.author_id  # noqa: W503
-            ):
-                self.quotes_task.cancel()
-                self.quotes_task = self.bot.loop.create_task(self.run_daily_quotes())
         except Exception as e:
             await safe_send(ctx, f"Error: {e}", protect_postgres_host=True)
         else:
@@ -1050,13 +1151,14 @@ class Other(commands.Cog):
             raise commands.UserInputError(
                 "There are no daily quotes set up in this channel."
             )
+        await self.bot.ensure_chunked(ctx.guild)
         message = "Here's everyone that set up a daily quote in this channel:"
         for r in records:
             member = ctx.guild.get_member(r["author_id"])
             if member:
                 name = member.name
             else:
-                name = r["author_id"]
+                name = f"ID {r['author_id']}"
             message += "\n" + name
         await ctx.send(message)
 
@@ -1093,66 +1195,13 @@ class Other(commands.Cog):
             channel_id,
         )
 
-    async def get_next_quote_info(
-        self,
-    ) -> tuple[datetime | None, int | None, Messageable | None]:
-        """Gets from the database the info for the nearest (in time) daily quote task
-
-        Returns (target_time, author_id, destination).
-        If there is no next daily quote, this function returns (None, None, None).
-        """
-        r = await self.bot.db.fetchrow(
-            """
-            SELECT *
-            FROM daily_quotes
-            ORDER BY target_time
-            LIMIT 1;
-            """
-        )
-        if r is None:
-            return None, None, None
-        target_time = r["target_time"]
-        author_id = r["author_id"]
-        if r["is_dm"]:
-            destination = self.bot.get_user(r["author_id"])
-        else:
-            server = self.bot.get_guild(r["server_id"])
-            destination = server.get_channel(r["channel_id"])
-        return target_time, author_id, destination
-
-    async def update_quote_target_time(
-        self, old_target_time: datetime, author_id: int
-    ) -> None:
-        """Changes a daily quote's target time in the database to tomorrow"""
-        tomorrow: datetime = datetime.now(timezone.utc) + timedelta(days=1)
-        new_target_time: datetime = datetime(
-            year=tomorrow.year,
-            month=tomorrow.month,
-            day=tomorrow.day,
-            hour=old_target_time.hour,
-            minute=old_target_time.minute,
-            second=old_target_time.second,
-            tzinfo=timezone.utc,
-        )
-        self.bot.logger.debug(f"new quote target time: {new_target_time}")
-
-        await self.bot.db.execute(
-            """
-            UPDATE daily_quotes
-            SET target_time = $1
-            WHERE author_id = $2
-            """,
-            new_target_time,
-            author_id,
-        )
-
     async def send_quote(self, destination: Messageable, requester_id: int) -> None:
         """Immediately sends a random quote to destination
 
         May raise ContentTypeError or json.decoder.JSONDecodeError.
         """
         quote, author = await self.get_quote()
-        requester: discord.User | None = self.bot.get_user(requester_id)
+        requester: discord.User | None = await self.bot.resolver.get_user(requester_id)
         if requester:
             requester_name: str = requester.name
         else:
@@ -95,11 +95,20 @@ class Owner(commands.Cog):
         python = sys.executable
         os.execl(python, python, *sys.argv)
 
-    @commands.hybrid_command(name="reset-error-reporting", aliases=["rer"])
-    async def reset_error_reporting(self, ctx):
-        """Allows dev mail about the next unexpected error"""
-        self.bot.error_is_reported = False
-        await ctx.send("`self.bot.error_is_reported` has been reset", ephemeral=True)
+    @commands.hybrid_command(
+        name="error-digest", aliases=["rer", "reset-error-reporting", "errors"]
+    )
+    async def error_digest(self, ctx):
+        """Sends the digest of unexpected errors now instead of waiting for the next one
+
+        Errors are grouped by their type and where they were raised, and a digest of
+        the groups with new errors is sent to the owner every ERROR_DIGEST_INTERVAL
+        seconds.
+        """
+        if await self.bot.error_aggregator.flush():
+            await ctx.send("The error digest has been sent.", ephemeral=True)
+        else:
+            await ctx.send("There are no new errors.", ephemeral=True)
 
     @commands.hybrid_command(
         name="list-servers",
@@ -153,6 +162,10 @@ class Owner(commands.Cog):
         process = psutil.Process()
         memory_info_ = process.memory_info()
         ram_mb = memory_info_.rss / 1024 / 1024  # rss is short for "resident set size"
+        servers = self.bot.guilds
+        chunked_count = sum(server.chunked for server in servers)
+        cached_member_count = sum(len(server.members) for server in servers)
+        message_cache_size = self.bot.dev_settings.message_cache_size or 0
         await ctx.send(
             dedent(
                 f"""\
@@ -160,10 +173,99 @@ class Owner(commands.Cog):
                 virtual RAM: {round(ram_percent, 2)}%
                 CPU: {psutil.cpu_percent(interval=1)}%
                 disk: {psutil.disk_usage('/').percent}%
+                member cache policy: {self.bot.dev_settings.member_cache}
+                chunked servers: {chunked_count}/{len(servers)}
+                cached members: {cached_member_count}
+                cached users: {len(self.bot.users)}
+                cached messages: {len(self.bot.cached_messages)}/{message_cache_size}
                 """
             )
         )
 
+    @commands.hybrid_command(name="http-pool", aliases=["pool", "httppool"])
+    async def http_pool(self, ctx) -> None:
+        """Shows the shared HTTP connection pool's settings and activity"""
+        settings = self.bot.dev_settings
+        stats = self.bot.http_pool_stats
+        await ctx.send(
+            dedent(
+                f"""\
+                connection limit: {settings.http_pool_limit}
+                connection limit per host: {settings.http_pool_limit_per_host}
+                keep-alive timeout: {settings.http_keepalive_timeout} s
+                DNS cache TTL: {settings.http_dns_cache_ttl} s
+                requests in flight: {stats.requests_in_flight}
+                requests waiting for a connection: {stats.connections_waiting}
+                requests started: {stats.requests_started}
+                requests failed: {stats.requests_failed}
+                connections created: {stats.connections_created}
+                connections reused: {stats.connections_reused}
+                DNS cache hits: {stats.dns_cache_hits}
+                DNS cache misses: {stats.dns_cache_misses}
+                """
+            ),
+            ephemeral=True,
+        )
+
+    @commands.hybrid_command(aliases=["latency", "latencies"])
+    async def metrics(self, ctx) -> None:
+        """Shows each command's latency percentiles, error count, and uses in flight
+
+        Commands are sorted from slowest to fastest 95th percentile latency. The same
+        metrics can be scraped in the Prometheus text format if METRICS_PORT is set.
+        """
+        entries: list[str] = []
+        all_stats = sorted(
+            self.bot.metrics.commands.items(),
+            key=lambda item: item[1].latency.quantile(0.95),
+            reverse=True,
+        )
+        for (cog_name, command_name), stats in all_stats:
+            latency = stats.latency
+            entries.append(
+                f"`{command_name}` ({cog_name or 'no cog'}): {latency.count} uses,"
+                f" {stats.errors} errors, {stats.in_flight} in flight\n"
+                f"p50 {latency.quantile(0.5) * 1000:.0f} ms,"
+                f" p95 {latency.quantile(0.95) * 1000:.0f} ms,"
+                f" p99 {latency.quantile(0.99) * 1000:.0f} ms"
+            )
+        for name, histogram in self.bot.metrics.histograms.items():
+            entries.append(
+                f"`{name}`: {histogram.count} values\n"
+                f"p50 {histogram.quantile(0.5):.3f},"
+                f" p95 {histogram.quantile(0.95):.3f},"
+                f" p99 {histogram.quantile(0.99):.3f}"
+            )
+        if not entries:
+            raise commands.UserInputError("No metrics have been recorded yet.")
+        paginator = Paginator("metrics", entries, length=10, ephemeral=True)
+        await paginator.run(ctx)
+
+    @commands.hybrid_command(name="loop-lag", aliases=["lag", "looplag"])
+    async def loop_lag(self, ctx) -> None:
+        """Shows the event loop's lag and the code that blocked it the most
+
+        Each lag spike above LOOP_LAG_THRESHOLD is blamed on the code the loop's thread
+        was running while it was blocked, along with any commands that were running.
+        """
+        monitor = self.bot.lag_monitor
+        entries: list[str] = [
+            f"threshold: {monitor.threshold * 1000:.0f} ms\n"
+            f"lag over the last {len(monitor.samples)} samples:"
+            f" p50 {monitor.lag_quantile(0.5) * 1000:.0f} ms,"
+            f" p99 {monitor.lag_quantile(0.99) * 1000:.0f} ms,"
+            f" max {monitor.lag_quantile(1) * 1000:.0f} ms"
+        ]
+        for offender in monitor.worst_offenders(25):
+            entries.append(
+                f"{offender.count} spikes, {offender.total_lag:.2f} s total,"
+                f" {offender.max_lag * 1000:.0f} ms max,"
+                f" last <t:{int(offender.last_seen)}:R>\n"
+                f"`{offender.description}`"
+            )
+        paginator = Paginator("event loop lag", entries, length=10, ephemeral=True)
+        await paginator.run(ctx)
+
     @commands.hybrid_command()
     async def src(self, ctx, command_name: str):
         """Shows the bot's source code for a command
@@ -1,107 +1,130 @@
+import asyncio
 from datetime import datetime
 from datetime import timezone
 
 import asyncpg  # https://pypi.org/project/asyncpg/
 import discord  # https://pypi.org/project/discord.py/
-from discord.abc import Messageable  # https://pypi.org/project/discord.py/
 from discord.ext import commands  # https://pypi.org/project/discord.py/
 
 from cogs.utils.common import block_nsfw_channels
 from cogs.utils.common import check_ownership_permission
 from cogs.utils.common import plural
-from cogs.utils.io import LinkButton
 from cogs.utils.io import safe_send
+from cogs.utils.outbox import OutboxMessage
 from cogs.utils.paginator import Paginator
+from cogs.utils.scheduler import TimerHeap
 from cogs.utils.time import create_long_datetime_stamp
 from cogs.utils.time import create_relative_timestamp
 from cogs.utils.time import parse_time_message
 
 
-class RunningReminderInfo:
-    def __init__(self, target_time: datetime, id: int) -> None:
-        self.target_time = target_time
-        self.id = id
-
-
 class Reminders(commands.Cog):
     """Send yourself messages at specific times."""
 
     def __init__(self, bot) -> None:
         self.bot = bot
+        self.timers: TimerHeap[int] = TimerHeap()  # Reminder IDs by target time.
         self._task = self.bot.loop.create_task(self.run_reminders())
-        self.running_reminder_info: RunningReminderInfo | None = None
         self.reminder_ownership_limit = 5
+        self.bot.quotas.register("reminders", self.count_users_reminders)
+        self.bot.write_buffer.register(
+            "reminder_jump_urls",
+            """
+            UPDATE reminders
+            SET jump_url = $2
+            WHERE id = $1;
+            """,
+        )
 
     def cog_unload(self):
         self._task.cancel()
 
-    async def create_table_if_not_exists(self) -> None:
-        await self.bot.db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS reminders (
-                id SERIAL PRIMARY KEY,
-                author_id BIGINT NOT NULL,
-                start_time TIMESTAMPTZ NOT NULL,
-                target_time TIMESTAMPTZ NOT NULL,
-                message VARCHAR(500) NOT NULL,
-                is_dm BOOLEAN NOT NULL,
-                server_id BIGINT,
-                channel_id BIGINT,
-                jump_url TEXT,  -- The URL to the message that created the reminder.
-                UNIQUE (author_id, start_time)
-            );
-            """
-        )
-
-    async def run_reminders(self, jump_url: str | None = None) -> None:
-        """A task that finds the next reminder time, waits for that time, and sends
+    async def run_reminders(self) -> None:
+        """A task that loads the reminders into the timer heap and sends them when due
 
-        Parameters
-        ----------
-        jump_url: str | None
-            The jump URL to the reminder that should be run first. This may be required
-            to avoid race conditions if the reminder that should run first was just
-            created.
+        The database is only queried when the task starts and after an error. After
+        that, the `remind` and delete commands add and cancel timers directly. Reloading
+        after an error brings back the due reminders that were not sent.
         """
         await self.bot.wait_until_ready()
-        await self.create_table_if_not_exists()
-        try:
-            while not self.bot.is_closed():
-                next_reminder_info: tuple | None = await self.get_next_reminder_info()
-                if next_reminder_info is None:
-                    self.running_reminder_info = None
-                    self._task.cancel()
-                    return
+        while not self.bot.is_closed():
+            try:
+                await self.load_reminders()
+                while True:
+                    await self.send_reminders(await self.timers.wait_for_due())
+            except (
+                OSError,
+                discord.ConnectionClosed,
+                asyncpg.PostgresConnectionError,
+            ) as error:
+                print(f"  run_reminders {error = }")  # noqa: E251, E202
+                await asyncio.sleep(30)
+            except Exception as error:
+                print(f"  run_reminders {error = }")  # noqa: E251, E202
+                if self.bot.logger is not None:
+                    self.bot.logger.error(
+                        f"run_reminders {type(error).__name__}: {error}"
+                    )
+                self.bot.error_aggregator.record(error, "task `run_reminders`")
+                await asyncio.sleep(30)
+
+    async def load_reminders(self) -> None:
+        """Replaces the timers with the reminders this cluster is responsible for"""
+        # Cleared before the query so that no reminder created during it is lost.
+        self.timers.clear()
+        shard_count, shard_ids = self.bot.get_shard_filter()
+        records = await self.bot.db.fetch(
+            """
+            SELECT id, target_time
+            FROM reminders
+            WHERE ((COALESCE(server_id, 0) >> 22) % $1) = ANY($2);
+            """,
+            shard_count,
+            shard_ids,
+        )
+        for r in records:
+            self.timers.push(r["id"], r["target_time"])
 
-                (
-                    start_time,
-                    target_time,
-                    id,
-                    destination,
-                    author_id,
-                    message,
-                    jump_url_,
-                ) = next_reminder_info
+    async def send_reminders(self, reminder_ids: list[int]) -> None:
+        """Moves due reminders from the reminders table to the outbox
 
-                if jump_url is None:
-                    jump_url = jump_url_
-                self.running_reminder_info = RunningReminderInfo(target_time, id)
-                await discord.utils.sleep_until(target_time)
-                relative_start = await create_relative_timestamp(start_time)
-                await destination.send(
-                    f"<@!{author_id}> {relative_start}: {message}",
-                    view=LinkButton("see original message", jump_url),
+        The reminders are deleted and their messages are saved to the outbox in one
+        transaction, so none are lost even if the bot restarts right after. The outbox
+        sends each message at least once. Reminders already deleted, such as with a
+        command run by another cluster, are skipped.
+        """
+        # The reminders' jump URLs may still be in the write buffer.
+        await self.bot.write_buffer.flush("reminder_jump_urls")
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                records = await conn.fetch(
+                    """
+                    DELETE FROM reminders
+                    WHERE id = ANY($1)
+                    RETURNING *;
+                    """,
+                    reminder_ids,
                 )
-                jump_url = None
-                await self.delete_reminder_from_db(id)
-        except (
-            OSError,
-            discord.ConnectionClosed,
-            asyncpg.PostgresConnectionError,
-        ) as error:
-            print(f"  run_reminders {error = }")  # noqa: E251, E202
-            self._task.cancel()
-            self._task = self.bot.loop.create_task(self.run_reminders())
+                messages = [await self.create_reminder_message(r) for r in records]
+                await self.bot.outbox.enqueue(conn, messages)
+        for r in records:
+            self.bot.quotas.adjust("reminders", r["author_id"], -1)
+        if records:
+            self.bot.outbox.wake()
+
+    async def create_reminder_message(self, r: asyncpg.Record) -> OutboxMessage:
+        """Creates the outbox message that delivers a reminder"""
+        relative_start = await create_relative_timestamp(r["start_time"])
+        return OutboxMessage(
+            "reminder",
+            r["target_time"],
+            r["is_dm"],
+            r["author_id"] if r["is_dm"] else r["channel_id"],
+            r["server_id"] or 0,
+            content=f"<@!{r['author_id']}> {relative_start}: {r['message']}",
+            link_label="see original message",
+            link_url=r["jump_url"],
+        )
 
     @commands.hybrid_group(
         aliases=["r", "reminder", "remindme", "timer"], invoke_without_command=True
@@ -126,18 +149,15 @@ class Reminders(commands.Cog):
             if target_time < start_time:
                 raise commands.BadArgument("Please choose a time in the future.")
             id_ = await self.save_reminder_to_db(ctx, start_time, target_time, message)
+            self.bot.quotas.adjust("reminders", ctx.author.id, 1)
             relative_timestamp = await create_relative_timestamp(target_time)
             long_datetime_stamp = await create_long_datetime_stamp(target_time)
             msg = await ctx.send(
                 f"Reminder set! {relative_timestamp} ({long_datetime_stamp})"
                 f" I will remind you: {message}"
             )
-            await self.save_jump_url(msg.jump_url, id_)
-            if self.running_reminder_info is None:
-                self._task = self.bot.loop.create_task(self.run_reminders(msg.jump_url))
-            elif target_time < self.running_reminder_info.target_time:
-                self._task.cancel()
-                self._task = self.bot.loop.create_task(self.run_reminders(msg.jump_url))
+            self.bot.write_buffer.add("reminder_jump_urls", id_, id_, msg.jump_url)
+            self.timers.push(id_, target_time)
 
     @remind.command(name="create", aliases=["c"])
     async def create_reminder(self, ctx, *, time_and_message: str):
@@ -155,6 +175,7 @@ class Reminders(commands.Cog):
     @remind.command(name="list", aliases=["l"])
     async def list_reminders(self, ctx):
         """Shows all of your reminders"""
+        await self.bot.write_buffer.flush("reminder_jump_urls")
         records = await self.bot.db.fetch(
             """
             SELECT *
@@ -200,12 +221,10 @@ class Reminders(commands.Cog):
                 id,
                 ctx.author.id,
             )
-            if (
-                self.running_reminder_info is not None
-                and record["id"] == self.running_reminder_info.id  # noqa: W503
-            ):
-                self._task.cancel()
-                self._task = self.bot.loop.create_task(self.run_reminders())
+            if record is None:
+                raise commands.BadArgument("Reminder not found.")
+            self.timers.cancel(record["id"])
+            self.bot.quotas.adjust("reminders", ctx.author.id, -1)
             reminder_message = record["message"]
             await ctx.send(f'Reminder deleted: "{reminder_message}"')
         except Exception as e:
@@ -240,13 +259,8 @@ class Reminders(commands.Cog):
                 ctx.author.id,
             )
             for r in records:
-                if (
-                    self.running_reminder_info is not None
-                    and r["id"] == self.running_reminder_info.id  # noqa: W503
-                ):
-                    self._task.cancel()
-                    self._task = self.bot.loop.create_task(self.run_reminders())
-                    break
+                self.timers.cancel(r["id"])
+            self.bot.quotas.set_count("reminders", ctx.author.id, 0)
         except Exception as e:
             await safe_send(
                 ctx, f"Error: {e}", protect_postgres_host=True, ephemeral=True
@@ -265,7 +279,7 @@ class Reminders(commands.Cog):
             The ID of the reminder to delete.
         """
         try:
-            record = await self.bot.db.fetch(
+            record = await self.bot.db.fetchrow(
                 """
                 DELETE FROM reminders
                 WHERE id = $1
@@ -275,21 +289,20 @@ class Reminders(commands.Cog):
                 reminder_id,
                 ctx.guild.id,
             )
-            if (
-                self.running_reminder_info is not None
-                and record["id"] == self.running_reminder_info.id  # noqa: W503
-            ):
-                self._task.cancel()
-                self._task = self.bot.loop.create_task(self.run_reminders())
+            if record is None:
+                raise commands.BadArgument("Reminder not found.")
+            self.timers.cancel(record["id"])
+            self.bot.quotas.adjust("reminders", record["author_id"], -1)
         except Exception as e:
             await safe_send(
                 ctx, f"Error: {e}", protect_postgres_host=True, ephemeral=True
             )
         else:
             message = record["message"]
-            author = ctx.guild.get_member(record["author"])
+            await self.bot.ensure_chunked(ctx.guild)
+            author = ctx.guild.get_member(record["author_id"])
             if author is None:
-                author = record["author"]
+                author = f"ID {record['author_id']}"
             else:
                 author = author.display_name
             await ctx.send(
@@ -307,51 +320,18 @@ class Reminders(commands.Cog):
             "reminders",
             self.bot.dev_settings.membership_removes_reminder_limit,
             self.reminder_ownership_limit,
-            self.count_users_reminders,
         )
 
     async def count_users_reminders(self, author_id: int) -> int:
-        """Counts the author's total reminders"""
-        records = await self.bot.db.fetch(
+        """Counts a user's reminders in the database"""
+        return await self.bot.db.fetchval(
             """
-            SELECT *
+            SELECT COUNT(*)
             FROM reminders
-            WHERE author_id = $1
+            WHERE author_id = $1;
             """,
             author_id,
         )
-        return len(records)
-
-    async def get_next_reminder_info(
-        self,
-    ) -> tuple[datetime, datetime, int, Messageable, int, str, str] | None:
-        """Gets from the database the info for the nearest (in time) reminder task
-
-        Returns (start_time, target_time, id, destination, author_id, message,
-        jump_url). If there is no next daily quote, this function returns None.
-        """
-        r = await self.bot.db.fetchrow(
-            """
-            SELECT *
-            FROM reminders
-            ORDER BY target_time
-            LIMIT 1;
-            """
-        )
-        if r is None:
-            return None
-        start_time = r["start_time"]
-        target_time = r["target_time"]
-        author_id = r["author_id"]
-        id = r["id"]
-        message = r["message"]
-        jump_url = r["jump_url"]
-        if r["is_dm"]:
-            destination = self.bot.get_user(r["author_id"])
-        else:
-            server = self.bot.get_guild(r["server_id"])
-            destination = server.get_channel(r["channel_id"])
-        return start_time, target_time, id, destination, author_id, message, jump_url
 
     async def save_reminder_to_db(
         self, ctx, start_time: datetime, target_time: datetime, message: str
@@ -381,28 +361,6 @@ class Reminders(commands.Cog):
             channel_id,
         )
 
-    async def save_jump_url(self, jump_url: str, id_: int) -> None:
-        """Saves the jump URL for a reminder already in the database"""
-        await self.bot.db.execute(
-            """
-            UPDATE reminders
-            SET jump_url = $1
-            WHERE id = $2;
-            """,
-            jump_url,
-            id_,
-        )
-
-    async def delete_reminder_from_db(self, reminder_id: int) -> None:
-        """Deletes a row of the reminder table"""
-        await self.bot.db.execute(
-            """
-            DELETE FROM reminders
-            WHERE id = $1;
-            """,
-            reminder_id,
-        )
-
 
 async def setup(bot):
     await bot.add_cog(Reminders(bot))
@@ -134,48 +134,8 @@ class Settings(commands.Cog):
             self.default_server_bot_settings
         )
 
-    async def create_tables_if_not_exists(self) -> None:
-        await self.bot.wait_until_ready()
-        await self.bot.db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS timezones (
-                user_id BIGINT PRIMARY KEY NOT NULL,
-                timezone TEXT NOT NULL
-            );
-            CREATE TABLE IF NOT EXISTS prefixes (
-                id SERIAL PRIMARY KEY,
-                server_id BIGINT UNIQUE,
-                custom_prefixes TEXT[],
-                removed_default_prefixes TEXT[]
-            );
-            CREATE TABLE IF NOT EXISTS command_access_settings (
-                id SERIAL PRIMARY KEY,
-                cmd_name TEXT UNIQUE,
-                cmd_settings JSONB NOT NULL
-                    DEFAULT '{
-                        "global_users": {},
-                        "global_servers": {},
-                        "global": null,
-                        "servers": {}
-                    }'::jsonb
-            );
-            CREATE TABLE IF NOT EXISTS bot_access_settings (
-                -- This table should only ever have one row and one column.
-                -- Note its similarity to the table above.
-                bot_settings JSONB NOT NULL
-                    DEFAULT '{
-                        "global_users": {},
-                        "global_servers": {},
-                        "global": null,
-                        "servers": {}
-                    }'::jsonb
-            );
-            """
-        )
-
     async def load_custom_prefixes(self):
         await self.bot.wait_until_ready()
-        await self.create_tables_if_not_exists()
         try:
             records = await self.bot.db.fetch(
                 """
@@ -188,6 +148,7 @@ class Settings(commands.Cog):
                 self.bot.removed_default_prefixes[r["server_id"]] = r[
                     "removed_default_prefixes"
                 ]
+            self.bot.invalidate_prefix_table()
         except (
             OSError,
             discord.ConnectionClosed,
@@ -358,14 +319,7 @@ class Settings(commands.Cog):
     @_timezone.command(aliases=["v"])
     async def view(self, ctx):
         """Shows your current timezone setting if you have one"""
-        timezone = await self.bot.db.fetchval(
-            """
-            SELECT timezone
-            FROM timezones
-            WHERE user_id = $1;
-            """,
-            ctx.author.id,
-        )
+        timezone = await self.bot.timezone_cache.get(self.bot.db, ctx.author.id)
         if timezone is not None:
             await ctx.send(
                 f"Your current timezone setting is `{timezone}`", ephemeral=True
@@ -452,6 +406,7 @@ class Settings(commands.Cog):
             ctx.author.id,
             timezone,
         )
+        self.bot.timezone_cache.set(ctx.author.id, timezone)
 
     @_timezone.command(name="delete", aliases=["del"])
     async def delete_timezone(self, ctx):
@@ -468,6 +423,7 @@ class Settings(commands.Cog):
             """,
             ctx.author.id,
         )
+        self.bot.timezone_cache.set(ctx.author.id, None)
         if record is not None:
             await ctx.send(
                 (
@@ -529,6 +485,7 @@ class Settings(commands.Cog):
         # Remove the new prefix from the removed default prefixes, if it is there.
         try:
             self.bot.removed_default_prefixes[ctx.guild.id].remove(new_prefix)
+            self.bot.invalidate_prefix_table(ctx.guild.id)
             await self.bot.db.execute(
                 """
                 UPDATE prefixes
@@ -558,6 +515,7 @@ class Settings(commands.Cog):
             )
         custom_prefixes.append(new_prefix)
         self.bot.custom_prefixes[ctx.guild.id] = custom_prefixes
+        self.bot.invalidate_prefix_table(ctx.guild.id)
         await self.bot.db.execute(
             """
             INSERT INTO prefixes
@@ -596,6 +554,7 @@ class Settings(commands.Cog):
         if old_prefix in custom_prefixes:
             custom_prefixes.remove(old_prefix)
             self.bot.custom_prefixes[ctx.guild.id] = custom_prefixes
+            self.bot.invalidate_prefix_table(ctx.guild.id)
             await self.bot.db.execute(
                 """
                 UPDATE prefixes
@@ -623,6 +582,7 @@ class Settings(commands.Cog):
                 )
             removed_default_prefixes.append(old_prefix)
             self.bot.removed_default_prefixes[ctx.guild.id] = removed_default_prefixes
+            self.bot.invalidate_prefix_table(ctx.guild.id)
             await self.bot.db.execute(
                 """
                 INSERT INTO prefixes
@@ -648,11 +608,14 @@ class Settings(commands.Cog):
         You cannot delete the bot mention prefix.
         """
         default_prefixes: list[str] = self.bot.dev_settings.default_bot_prefixes
-        self.bot.removed_default_prefixes[ctx.guild.id] = default_prefixes
+        # Copy the default prefixes so that later changes to this server's removed
+        # prefixes cannot change the defaults.
+        self.bot.removed_default_prefixes[ctx.guild.id] = list(default_prefixes)
         try:
             del self.bot.custom_prefixes[ctx.guild.id]
         except KeyError:
             pass
+        self.bot.invalidate_prefix_table(ctx.guild.id)
         await self.bot.db.execute(
             """
             INSERT INTO prefixes
@@ -685,6 +648,7 @@ class Settings(commands.Cog):
             del self.bot.removed_default_prefixes[ctx.guild.id]
         except KeyError:
             pass
+        self.bot.invalidate_prefix_table(ctx.guild.id)
         await self.bot.db.execute(
             """
             DELETE FROM prefixes
@@ -1465,6 +1429,7 @@ class Settings(commands.Cog):
             server = self.bot.get_guild(ctx.guild.id)
             if not server:
                 raise KeyError
+            await self.bot.ensure_chunked(server)
             s_cmd_settings = None
             if cmd_settings:
                 try:
@@ -1522,6 +1487,7 @@ class Settings(commands.Cog):
         """Gets names and settings of users in ctx.guild that have a global setting"""
         entries = []
         members = dict()
+        await self.bot.ensure_chunked(ctx.guild)
         for user_id in settings["global_users"]:
             member = ctx.guild.get_member(user_id)
             if member is None:
@@ -1,6 +1,8 @@
 import io
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
+from typing import Any
 
 import asyncpg  # https://pypi.org/project/asyncpg/
 import discord  # https://pypi.org/project/discord.py/
@@ -19,37 +21,16 @@ class Tags(commands.Cog):
 
     def __init__(self, bot) -> None:
         self.bot = bot
-        self._task = bot.loop.create_task(self.create_table_if_not_exists())
         self.tag_ownership_limit = 5
         self.tag_name_length_limit = 50
         self.tag_content_length_limit = 1500
+        self.bot.quotas.register("tags", self.count_users_tags)
 
     async def cog_check(self, ctx):
         if not ctx.guild:
             raise commands.NoPrivateMessage
         return True
 
-    async def create_table_if_not_exists(self) -> None:
-        await self.bot.wait_until_ready()
-        await self.bot.db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tags (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(50) NOT NULL,
-                parent_tag_id INT,
-                content VARCHAR(1500),
-                file_url TEXT,
-                created TIMESTAMPTZ NOT NULL,
-                owner_id BIGINT NOT NULL,
-                server_id BIGINT NOT NULL,
-                views INT DEFAULT 0,
-                UNIQUE (name, server_id)
-            );
-            """
-            # Either parent_tag_id is NULL, or content and file_url are both NULL
-            # (though either content or file_url may be NULL regardless).
-        )
-
     @commands.hybrid_group(invoke_without_command=True)
     async def tag(self, ctx, *, tag_name: str):
         """A group of commands for creating and viewing tags
@@ -64,18 +45,8 @@ class Tags(commands.Cog):
     @tag.command(name="view", aliases=["v"])
     async def view_tag(self, ctx, *, tag_name: str):
         """Finds and shows a tag's contents"""
-        record = await self.bot.db.fetchrow(
-            """
-            UPDATE tags
-            SET views = views + 1
-            WHERE LOWER(name) = LOWER($1)
-                AND server_id = $2
-            RETURNING *;
-            """,
-            tag_name,
-            ctx.guild.id,
-        )
-        await self.send_tag_contents(ctx, record)
+        tag = await self.bot.tag_index.get(self.bot.db, ctx.guild.id, tag_name)
+        await self.send_tag_contents(ctx, tag)
 
     @tag.command(name="create", aliases=["c"])
     async def create_tag(self, ctx, *, name_and_content: str):
@@ -86,11 +57,12 @@ class Tags(commands.Cog):
         now = datetime.now(timezone.utc)
         file_url = await get_attachment_url(ctx)
         try:
-            await self.bot.db.execute(
+            record = await self.bot.db.fetchrow(
                 """
                 INSERT INTO tags
                 (name, content, file_url, created, owner_id, server_id)
                 VALUES ($1, $2, $3, $4, $5, $6)
+                RETURNING *;
                 """,
                 name,
                 content,
@@ -99,6 +71,8 @@ class Tags(commands.Cog):
                 ctx.author.id,
                 ctx.guild.id,
             )
+            self.bot.tag_index.add(ctx.guild.id, record)
+            self.bot.quotas.adjust("tags", ctx.author.id, 1)
             await ctx.send(f'Successfully created tag "{name}"')
         except asyncpg.exceptions.UniqueViolationError:
             await ctx.send(f'A tag named "{name}" already exists.')
@@ -218,6 +192,7 @@ class Tags(commands.Cog):
             raise commands.BadArgument("Tag not found.")
         if record["owner_id"] == ctx.author.id:
             raise commands.BadArgument("This tag already belongs to you.")
+        await self.bot.ensure_chunked(ctx.guild)
         owner = ctx.guild.get_member(record["owner_id"])
         if owner is not None:
             raise commands.BadArgument("The tag's owner is still in this server.")
@@ -246,18 +221,8 @@ class Tags(commands.Cog):
     @tag.command(name="raw", aliases=["r"])
     async def get_raw_tag(self, ctx, *, tag_name: str):
         """Shows the unrendered text content of a tag"""
-        record = await self.bot.db.fetchrow(
-            """
-            UPDATE tags
-            SET views = views + 1
-            WHERE LOWER(name) = LOWER($1)
-                AND server_id = $2
-            RETURNING *;
-            """,
-            tag_name,
-            ctx.guild.id,
-        )
-        await self.send_tag_contents(ctx, record, send_raw=True)
+        tag = await self.bot.tag_index.get(self.bot.db, ctx.guild.id, tag_name)
+        await self.send_tag_contents(ctx, tag, send_raw=True)
 
     @tag.command(name="search", aliases=["s"])
     async def tag_search(self, ctx, *, query: str):
@@ -315,11 +280,41 @@ class Tags(commands.Cog):
         )
         await self.handle_tag_alias_creation(ctx, record, new_alias)
 
-    @tag.command(name="stats", hidden=True)
-    async def tag_stats(self, ctx):
-        """Shows tag statistics about a member or the server"""
-        # TODO
-        await ctx.send("This command is under construction.")
+    @tag.command(name="stats")
+    async def tag_stats(self, ctx, member: discord.Member = None):
+        """Shows tag statistics about a member or the server
+
+        Shows the views in the last 30 days of the server's tags, or of a member's
+        tags and of the tags the member viewed.
+        """
+        await self.bot.tag_views.flush()
+        if member is None:
+            embed = discord.Embed(title=f"Tag stats for {ctx.guild.name}")
+            trend = await self.fetch_tag_view_trend(ctx.guild.id)
+            embed.add_field(name="Views", value=await self.format_tag_view_trend(trend))
+            top_tags = await self.fetch_top_tags(ctx.guild.id)
+            embed.add_field(name="Top tags", value=await self.format_top_tags(top_tags))
+            top_viewers = await self.fetch_top_tag_viewers(ctx.guild.id)
+            embed.add_field(
+                name="Top tag users",
+                value=await self.format_top_tag_viewers(top_viewers),
+            )
+        else:
+            embed = discord.Embed(title=f"Tag stats for {member.name}")
+            trend = await self.fetch_tag_view_trend(ctx.guild.id, owner_id=member.id)
+            embed.add_field(
+                name="Views of their tags",
+                value=await self.format_tag_view_trend(trend),
+            )
+            top_tags = await self.fetch_top_tags(ctx.guild.id, owner_id=member.id)
+            embed.add_field(
+                name="Their top tags", value=await self.format_top_tags(top_tags)
+            )
+            trend = await self.fetch_tag_view_trend(ctx.guild.id, viewer_id=member.id)
+            embed.add_field(
+                name="Tags they viewed", value=await self.format_tag_view_trend(trend)
+            )
+        await ctx.send(embed=embed)
 
     @tag.command(name="make", hidden=True)
     async def make_tag(self, ctx):
@@ -343,18 +338,8 @@ class Tags(commands.Cog):
     @tag_ID.command(name="view", aliases=["v"])
     async def view_tag_by_id(self, ctx, tag_id: int):
         """Finds and shows a tag's contents"""
-        record = await self.bot.db.fetchrow(
-            """
-            UPDATE tags
-            SET views = views + 1
-            WHERE id = $1
-                AND server_id = $2
-            RETURNING *;
-            """,
-            tag_id,
-            ctx.guild.id,
-        )
-        await self.send_tag_contents(ctx, record)
+        tag = await self.bot.tag_index.get_by_id(self.bot.db, ctx.guild.id, tag_id)
+        await self.send_tag_contents(ctx, tag)
 
     @tag_ID.command(name="info", aliases=["i"])
     async def tag_info_by_id(self, ctx, tag_id: int):
@@ -444,6 +429,7 @@ class Tags(commands.Cog):
             raise commands.BadArgument("Tag not found.")
         if record["owner_id"] == ctx.author.id:
             raise commands.BadArgument("This tag already belongs to you.")
+        await self.bot.ensure_chunked(ctx.guild)
         owner = ctx.guild.get_member(record["owner_id"])
         if owner is not None:
             raise commands.BadArgument("The tag's owner is still in this server.")
@@ -472,18 +458,8 @@ class Tags(commands.Cog):
     @tag_ID.command(name="raw", aliases=["r"])
     async def get_raw_tag_by_id(self, ctx, tag_id: int):
         """Shows the unrendered text content of a tag"""
-        record = await self.bot.db.fetchrow(
-            """
-            UPDATE tags
-            SET views = views + 1
-            WHERE id = $1
-                AND server_id = $2
-            RETURNING *;
-            """,
-            tag_id,
-            ctx.guild.id,
-        )
-        await self.send_tag_contents(ctx, record, send_raw=True)
+        tag = await self.bot.tag_index.get_by_id(self.bot.db, ctx.guild.id, tag_id)
+        await self.send_tag_contents(ctx, tag, send_raw=True)
 
     @tag_ID.command(name="alias")
     async def create_tag_alias_by_id(self, ctx, tag_id: int, *, new_alias: str):
@@ -502,30 +478,32 @@ class Tags(commands.Cog):
         )
         await self.handle_tag_alias_creation(ctx, record, new_alias)
 
-    @tag_ID.command(name="stats", hidden=True)
+    @tag_ID.command(name="stats")
     async def tag_stats_by_id(self, ctx, tag_id: int):
-        """Shows tag statistics about a member or the server"""
-        # TODO
-        await ctx.send("This command is under construction.")
+        """Shows statistics about a tag's views in the last 30 days"""
+        tag = await self.bot.tag_index.get_by_id(self.bot.db, ctx.guild.id, tag_id)
+        if tag is None:
+            raise commands.BadArgument("Tag not found.")
+        await self.bot.tag_views.flush()
+        embed = discord.Embed(title=f"Tag stats for {tag['name']}")
+        trend = await self.fetch_tag_view_trend(ctx.guild.id, tag_id=tag_id)
+        embed.add_field(name="Views", value=await self.format_tag_view_trend(trend))
+        top_viewers = await self.fetch_top_tag_viewers(ctx.guild.id, tag_id=tag_id)
+        embed.add_field(
+            name="Top users", value=await self.format_top_tag_viewers(top_viewers)
+        )
+        await ctx.send(embed=embed)
 
     async def send_tag_contents(
-        self, ctx, record: asyncpg.Record, send_raw: bool = False
+        self, ctx, record: dict[str, Any] | None, send_raw: bool = False
     ) -> None:
         """Sends ctx the contents of a tag or an error message if necessary
 
-        If record is an alias, the parent record will be retrieved.
+        Takes a tag from the tag index, where aliases already have their parent tag's
+        contents, and counts the view after sending. Views are saved in batches.
         """
         if record is None:
             raise commands.BadArgument("Tag not found.")
-        if record["parent_tag_id"]:
-            record = await self.bot.db.fetchrow(
-                """
-                SELECT *
-                FROM tags
-                WHERE id = $1;
-                """,
-                record["parent_tag_id"],
-            )
         if send_raw:
             content = record["content"].replace("`", "\\`")
             if record["file_url"]:
@@ -535,8 +513,9 @@ class Tags(commands.Cog):
             await ctx.send(record["content"])
         else:
             await self.handle_attachment_sending(ctx, record)
+        self.bot.tag_views.add(record["id"], ctx.guild.id, ctx.author.id)
 
-    async def handle_attachment_sending(self, ctx, record: asyncpg.Record) -> None:
+    async def handle_attachment_sending(self, ctx, record: dict[str, Any]) -> None:
         """Gets and sends to ctx a tag's attachment, as well as any content it may have
 
         An attachment is required, but text content is optional.
@@ -556,7 +535,7 @@ class Tags(commands.Cog):
             )
             await ctx.send(record["content"])
 
-    async def get_attachment_bytes(self, ctx, record: asyncpg.Record) -> bytes | None:
+    async def get_attachment_bytes(self, ctx, record: dict[str, Any]) -> bytes | None:
         """Gets the bytes of the tag's attachment with an async GET request
 
         Assumes record['file_url'] is not None. Sends ctx an error message and returns
@@ -612,6 +591,123 @@ class Tags(commands.Cog):
         paginator = Paginator(title=title, entries=entries)
         await paginator.run(ctx)
 
+    async def fetch_tag_view_trend(
+        self,
+        server_id: int,
+        *,
+        owner_id: int | None = None,
+        viewer_id: int | None = None,
+        tag_id: int | None = None,
+    ) -> asyncpg.Record:
+        """Counts tag views in the last 7 days, the 7 days before, and the last 30 days
+
+        Only counts the views of tags that belong to owner_id, of tags viewed by
+        viewer_id, or of tag_id, if given.
+        """
+        now = datetime.now(timezone.utc)
+        return await self.bot.db.fetchrow(
+            """
+            SELECT COALESCE(SUM(r.views) FILTER (WHERE r.hour >= $2), 0) AS last_7_days,
+                COALESCE(
+                    SUM(r.views) FILTER (WHERE r.hour >= $3 AND r.hour < $2), 0
+                ) AS previous_7_days,
+                COALESCE(SUM(r.views), 0) AS last_30_days
+            FROM tag_view_rollups AS r
+            JOIN tags AS t
+                ON t.id = r.tag_id
+            WHERE r.server_id = $1
+                AND r.hour >= $4
+                AND ($5::BIGINT IS NULL OR t.owner_id = $5)
+                AND ($6::BIGINT IS NULL OR r.viewer_id = $6)
+                AND ($7::INT IS NULL OR r.tag_id = $7);
+            """,
+            server_id,
+            now - timedelta(days=7),
+            now - timedelta(days=14),
+            now - timedelta(days=30),
+            owner_id,
+            viewer_id,
+            tag_id,
+        )
+
+    async def fetch_top_tags(
+        self, server_id: int, *, owner_id: int | None = None
+    ) -> list[asyncpg.Record]:
+        """Gets the 5 most viewed tags in the last 30 days, of owner_id if given"""
+        return await self.bot.db.fetch(
+            """
+            SELECT t.id, t.name, SUM(r.views) AS views
+            FROM tag_view_rollups AS r
+            JOIN tags AS t
+                ON t.id = r.tag_id
+            WHERE r.server_id = $1
+                AND r.hour >= $2
+                AND ($3::BIGINT IS NULL OR t.owner_id = $3)
+            GROUP BY t.id, t.name
+            ORDER BY views DESC
+            LIMIT 5;
+            """,
+            server_id,
+            datetime.now(timezone.utc) - timedelta(days=30),
+            owner_id,
+        )
+
+    async def fetch_top_tag_viewers(
+        self, server_id: int, *, tag_id: int | None = None
+    ) -> list[asyncpg.Record]:
+        """Gets the 5 members who viewed tags, or tag_id, most in the last 30 days"""
+        return await self.bot.db.fetch(
+            """
+            SELECT viewer_id, SUM(views) AS views
+            FROM tag_view_rollups
+            WHERE server_id = $1
+                AND hour >= $2
+                AND ($3::INT IS NULL OR tag_id = $3)
+            GROUP BY viewer_id
+            ORDER BY views DESC
+            LIMIT 5;
+            """,
+            server_id,
+            datetime.now(timezone.utc) - timedelta(days=30),
+            tag_id,
+        )
+
+    async def format_tag_view_trend(self, trend: asyncpg.Record) -> str:
+        """Describes the view counts from `fetch_tag_view_trend` for an embed field"""
+        last_7_days = trend["last_7_days"]
+        previous_7_days = trend["previous_7_days"]
+        if previous_7_days:
+            change = round((last_7_days - previous_7_days) / previous_7_days * 100)
+            change_text = f"{change:+}% from the 7 days before"
+        else:
+            change_text = "none in the 7 days before"
+        return (
+            f'{plural(last_7_days, "view||s")} in the last 7 days ({change_text})\n'
+            f'{plural(trend["last_30_days"], "view||s")} in the last 30 days'
+        )
+
+    async def format_top_tags(self, records: list[asyncpg.Record]) -> str:
+        """Lists the tags from `fetch_top_tags` for an embed field"""
+        if not records:
+            return "No views yet"
+        entries = []
+        for i, r in enumerate(records):
+            tag_name = r["name"].replace("`", "\\`")
+            entries.append(
+                f'{i+1}. `{tag_name}` ({plural(r["views"], "view||s")})'  # noqa: E226
+            )
+        return "\n".join(entries)
+
+    async def format_top_tag_viewers(self, records: list[asyncpg.Record]) -> str:
+        """Lists the members from `fetch_top_tag_viewers` for an embed field"""
+        if not records:
+            return "No views yet"
+        entries = []
+        for i, r in enumerate(records):
+            views = plural(r["views"], "view||s")
+            entries.append(f'{i+1}. <@{r["viewer_id"]}> ({views})')  # noqa: E226
+        return "\n".join(entries)
+
     async def check_tag_ownership_permission(self, member: discord.Member) -> None:
         """Raises commands.UserInputError if author has >= max # of tags allowed"""
         if member.bot:
@@ -622,22 +718,18 @@ class Tags(commands.Cog):
             "tags",
             self.bot.dev_settings.membership_removes_tag_limit,
             self.tag_ownership_limit,
-            self.count_users_tags,
         )
 
     async def count_users_tags(self, member_id: int) -> int:
         """Counts how many tags a user has globally"""
-        records = await self.bot.db.fetch(
+        return await self.bot.db.fetchval(
             """
-            SELECT *
+            SELECT COUNT(*)
             FROM tags
             WHERE owner_id = $1;
             """,
             member_id,
         )
-        if records:
-            return len(records)
-        return 0
 
     async def validate_new_tag_info(
         self,
@@ -691,17 +783,7 @@ class Tags(commands.Cog):
             )
 
         # Prevent duplicate tag names; not case-sensitive.
-        records = await self.bot.db.fetch(
-            """
-            SELECT *
-            FROM tags
-            WHERE LOWER(name) = LOWER($1)
-                AND server_id = $2;
-            """,
-            name,
-            server_id,
-        )
-        if records and len(records):
+        if await self.bot.tag_index.get(self.bot.db, server_id, name) is not None:
             raise commands.BadArgument(f'A tag named "{name}" already exists.')
         return True
 
@@ -713,6 +795,8 @@ class Tags(commands.Cog):
         """
         if record is None:
             raise commands.BadArgument("Tag not found.")
+        self.bot.tag_index.remove(ctx.guild.id, record["id"])
+        self.bot.quotas.adjust("tags", record["owner_id"], -1)
         tag_name = record["name"]
         if record["parent_tag_id"]:
             await ctx.send(f'Successfully deleted alias "{tag_name}".')
@@ -731,15 +815,17 @@ class Tags(commands.Cog):
 
         Returns the number of aliases deleted.
         """
-        ret = await self.bot.db.execute(
+        records = await self.bot.db.fetch(
             """
             DELETE FROM tags
-            WHERE parent_tag_id = $1;
+            WHERE parent_tag_id = $1
+            RETURNING owner_id;
             """,
             tag_id,
         )
-        n_deleted = int(ret.replace("DELETE ", ""))
-        return n_deleted
+        for r in records:
+            self.bot.quotas.adjust("tags", r["owner_id"], -1)
+        return len(records)
 
     async def handle_tag_transfer(
         self, ctx, record: asyncpg.Record, new_owner: discord.Member
@@ -776,18 +862,28 @@ class Tags(commands.Cog):
             parent_tag_id = record["id"]
         else:
             parent_tag_id = record["parent_tag_id"]
-        ret = await self.bot.db.execute(
+        records = await self.bot.db.fetch(
             """
-            UPDATE tags
+            UPDATE tags AS t
             SET owner_id = $1
-            WHERE id = $2
-                OR parent_tag_id = $2;
+            FROM (
+                SELECT id, owner_id
+                FROM tags
+                WHERE id = $2
+                    OR parent_tag_id = $2
+                FOR UPDATE
+            ) AS old
+            WHERE t.id = old.id
+            RETURNING old.owner_id;
             """,
             new_owner.id,
             parent_tag_id,
         )
-        n_transferred = int(ret.replace("UPDATE ", ""))
-        return n_transferred
+        # The tag and its aliases may have had different owners, so each of their
+        # counts is reloaded the next time it is needed.
+        for owner_id in {r["owner_id"] for r in records} | {new_owner.id}:
+            self.bot.quotas.invalidate("tags", owner_id)
+        return len(records)
 
     async def handle_tag_edit(
         self, ctx, record: asyncpg.Record, new_content: str
@@ -808,6 +904,7 @@ class Tags(commands.Cog):
             file_url,
             record["id"],
         )
+        self.bot.tag_index.edit(ctx.guild.id, record["id"], new_content, file_url)
         tag_name = record["name"]
         await ctx.send(f'Successfully edited tag "{tag_name}"')
 
@@ -828,18 +925,21 @@ class Tags(commands.Cog):
             raise commands.BadArgument("You cannot create an alias for an alias.")
         now = datetime.now(timezone.utc)
         try:
-            await self.bot.db.execute(
+            alias_record = await self.bot.db.fetchrow(
                 """
                 INSERT INTO tags
                 (name, parent_tag_id, created, owner_id, server_id)
-                VALUES ($1, $2, $3, $4, $5);
+                VALUES ($1, $2, $3, $4, $5)
+                RETURNING *;
                 """,
                 new_alias,
-                record["parent_tag_id"],
+                record["id"],
                 now,
                 ctx.author.id,
                 ctx.guild.id,
             )
+            self.bot.tag_index.add(ctx.guild.id, alias_record, record)
+            self.bot.quotas.adjust("tags", ctx.author.id, 1)
             await ctx.send(f'Successfully created tag alias "{new_alias}"')
         except asyncpg.exceptions.UniqueViolationError:
             raise commands.BadArgument(f'A tag named "{new_alias}" already exists.')
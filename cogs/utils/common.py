@@ -1,7 +1,4 @@
 import re
-from typing import Any
-from typing import Callable
-from typing import Coroutine
 
 import discord  # https://pypi.org/project/discord.py/
 from discord import PartialMessageable  # https://pypi.org/project/discord.py/
@@ -78,16 +75,38 @@ async def block_nsfw_channels(channel: Messageable | PartialMessageable) -> None
         raise commands.UserInputError("This command cannot be used in NSFW channels")
 
 
+async def get_support_server_role_ids(bot, user_id: int) -> list[int]:
+    """Gets the IDs of a user's roles in the support server
+
+    The support server's members are cached at startup. If this process does not run
+    the support server's shard, the roles are requested from Discord instead.
+    """
+    support_server_id: int = bot.dev_settings.support_server_id
+    support_server = bot.get_guild(support_server_id)
+    if support_server is not None and support_server.chunked:
+        member = support_server.get_member(user_id)
+        if member is None:
+            return []
+        return [role.id for role in member.roles]
+    try:
+        member_data = await bot.http.get_member(support_server_id, user_id)
+    except discord.NotFound:
+        return []
+    return [int(role_id) for role_id in member_data["roles"]]
+
+
 async def check_ownership_permission(
     bot,
     author: discord.User | discord.Member,
     category: str,
     membership_removes_limit: bool,
     ownership_limit: int,
-    ownership_counter: Callable[[int], Coroutine[Any, Any, int]],
 ) -> None:
     """Raises commands.UserInputError if author has reached the ownership limit
 
+    The count and membership status come from `bot.quotas`, so this usually does not
+    query the database or Discord.
+
     Parameters
     ----------
     bot
@@ -95,26 +114,18 @@ async def check_ownership_permission(
     author : discord.User | discord.Member
         The person requesting to create something.
     category : str
-        The plural name of what is being requested.
+        The plural name of what is being requested. Must be registered with
+        `bot.quotas`.
     membership_removes_limit : bool
         Whether membership should remove the ownership limit.
     ownership_limit : int
         How many of the requested thing a person can have.
-    ownership_counter : Callable[[int], Coroutine[Any, Any, int]]
-        A coroutine that takes a Discord user ID and returns the number of a thing that
-        user currently owns.
     """
     if author.id == bot.owner_id:
         return
-    if bot.dev_settings.support_server_id and membership_removes_limit:
-        support_server = bot.get_guild(bot.dev_settings.support_server_id)
-        member = support_server.get_member(author.id)
-        if member:
-            for role in member.roles:
-                if role.id in bot.dev_settings.membership_role_ids:
-                    return
-    c = await ownership_counter(author.id)
-    if c < ownership_limit:
+    if membership_removes_limit and await bot.quotas.is_member(author.id):
+        return
+    if await bot.quotas.get_count(category, author.id) < ownership_limit:
         return
     message = f"The current free {category} limit is {ownership_limit}."
     if bot.dev_settings.membership_link and membership_removes_limit:
@@ -130,6 +141,29 @@ async def check_ownership_permission(
 #####################
 
 
+def build_prefix_table(
+    default_prefixes: list[str],
+    removed_default_prefixes: list[str] | None,
+    custom_prefixes: list[str] | None,
+) -> tuple[str, ...]:
+    """Returns a server's unrendered command prefixes as an immutable tuple
+
+    The tuple keeps the order in which prefixes are tried: the default prefixes that
+    were not removed, then the custom prefixes. It can be passed directly to
+    `str.startswith`. The empty prefix is never included because prefixless command
+    invocation is only allowed in DMs.
+    """
+    removed = removed_default_prefixes or []
+    prefixes: list[str] = []
+    for p in default_prefixes:
+        if p and p not in removed and p not in prefixes:
+            prefixes.append(p)
+    for p in custom_prefixes or []:
+        if p and p not in prefixes:
+            prefixes.append(p)
+    return tuple(prefixes)
+
+
 async def get_prefixes_list(bot, message: discord.Message) -> list[str]:
     """Returns a list of the bot's rendered server-aware command prefixes
 
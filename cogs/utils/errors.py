@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+import traceback
+from collections import deque
+from typing import Awaitable
+from typing import Callable
+
+
+class ErrorGroup:
+    """Holds the occurrences of errors that have the same fingerprint"""
+
+    def __init__(self, summary: str, traceback_text: str, sample_count: int) -> None:
+        self.summary = summary
+        self.traceback_text = traceback_text
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.count = 0
+        self.unreported_count = 0
+        self.samples: deque[str] = deque(maxlen=sample_count)
+
+
+class ErrorAggregator:
+    """Groups unexpected errors by fingerprint and reports them in periodic digests
+
+    An error's fingerprint is its type and the innermost frame of its traceback, so
+    repeats of the same bug are counted together no matter how often they happen.
+    Each digest covers every group that had new occurrences since the last digest and
+    is sent with one call of `send_digest`.
+    """
+
+    def __init__(
+        self,
+        send_digest: Callable[[str, str], Awaitable[None]],
+        *,
+        digest_interval: float = 300,
+        sample_count: int = 3,
+        max_groups: int = 500,
+    ) -> None:
+        """Creates an ErrorAggregator object
+
+        Parameters
+        ----------
+        send_digest : Callable[[str, str], Awaitable[None]]
+            A coroutine function that takes a short summary and the full details of a
+            digest and sends them to the developer.
+        digest_interval : float
+            The number of seconds between digests.
+        sample_count : int
+            The number of most recent contexts to keep for each group.
+        max_groups : int
+            The number of groups to keep. The group seen least recently is forgotten
+            when a new group would exceed this.
+        """
+        self.send_digest = send_digest
+        self.digest_interval = digest_interval
+        self.sample_count = sample_count
+        self.max_groups = max_groups
+        self.groups: dict[str, ErrorGroup] = dict()
+        self.flush_lock = asyncio.Lock()
+
+    def record(self, error: BaseException, context: str) -> ErrorGroup:
+        """Counts one occurrence of an error
+
+        Parameters
+        ----------
+        error : BaseException
+            The error.
+        context : str
+            A short description of where the error happened, such as the command name
+            and the user's input.
+        """
+        fingerprint, summary = self.fingerprint(error)
+        try:
+            group = self.groups[fingerprint]
+        except KeyError:
+            if len(self.groups) >= self.max_groups:
+                oldest = min(self.groups, key=lambda f: self.groups[f].last_seen)
+                del self.groups[oldest]
+            traceback_text = "".join(
+                traceback.format_exception(type(error), error, error.__traceback__)
+            )
+            group = self.groups[fingerprint] = ErrorGroup(
+                summary, traceback_text, self.sample_count
+            )
+        group.count += 1
+        group.unreported_count += 1
+        group.last_seen = time.time()
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+        group.samples.append(f"{timestamp} {context}")
+        return group
+
+    def fingerprint(self, error: BaseException) -> tuple[str, str]:
+        """Returns an error's fingerprint and a one-line summary of it"""
+        error_type = type(error).__qualname__
+        tb = error.__traceback__
+        if tb is None:
+            return error_type, f"{error_type}: {error}"
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        code = tb.tb_frame.f_code
+        location = f"{os.path.basename(code.co_filename)}:{tb.tb_lineno}"
+        fingerprint = f"{error_type} {code.co_filename}:{tb.tb_lineno}"
+        return fingerprint, f"{error_type} in {code.co_name} ({location}): {error}"
+
+    async def run(self) -> None:
+        """A task that sends a digest of new errors every digest_interval seconds"""
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                print(f"  ErrorAggregator.run {error = }")  # noqa: E251, E202
+
+    async def flush(self) -> bool:
+        """Sends a digest of the errors since the last digest, if there are any
+
+        The counts are only reset if the digest was sent. Returns whether a digest was
+        sent. Flushes run one at a time so that the periodic digest and the owner's
+        command do not report the same errors twice.
+        """
+        async with self.flush_lock:
+            unreported = [
+                (group, group.unreported_count)
+                for group in self.groups.values()
+                if group.unreported_count
+            ]
+            if not unreported:
+                return False
+            unreported.sort(key=lambda item: item[1], reverse=True)
+            summary_lines = [
+                f"**{count}×** (total {group.count}) {group.summary[:200]}"
+                for group, count in unreported
+            ]
+            detail_sections = []
+            for group, count in unreported:
+                samples = "\n".join(group.samples)
+                detail_sections.append(
+                    f"{count} new, {group.count} total: {group.summary}\n"
+                    f"recent contexts:\n{samples}\n\n{group.traceback_text}"
+                )
+            await self.send_digest(
+                "\n".join(summary_lines), f"\n{'=' * 80}\n".join(detail_sections)
+            )
+            for group, count in unreported:
+                group.unreported_count -= count
+            return True
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import aiohttp  # https://pypi.org/project/aiohttp/
+
+
+class PoolStats:
+    """Counts the HTTP connection pool's activity using aiohttp's request tracing"""
+
+    def __init__(self) -> None:
+        self.requests_started = 0
+        self.requests_in_flight = 0
+        self.requests_failed = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connections_waiting = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def create_trace_config(self) -> aiohttp.TraceConfig:
+        """Creates a trace config that updates these counters"""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self.on_request_start)
+        trace_config.on_request_end.append(self.on_request_end)
+        trace_config.on_request_exception.append(self.on_request_exception)
+        trace_config.on_connection_queued_start.append(self.on_queued_start)
+        trace_config.on_connection_queued_end.append(self.on_queued_end)
+        trace_config.on_connection_create_end.append(self.on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self.on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(self.on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self.on_dns_cache_miss)
+        return trace_config
+
+    async def on_request_start(self, session, context: SimpleNamespace, params) -> None:
+        self.requests_started += 1
+        self.requests_in_flight += 1
+
+    async def on_request_end(self, session, context: SimpleNamespace, params) -> None:
+        self.requests_in_flight -= 1
+
+    async def on_request_exception(
+        self, session, context: SimpleNamespace, params
+    ) -> None:
+        self.requests_in_flight -= 1
+        self.requests_failed += 1
+
+    async def on_queued_start(self, session, context: SimpleNamespace, params) -> None:
+        self.connections_waiting += 1
+
+    async def on_queued_end(self, session, context: SimpleNamespace, params) -> None:
+        self.connections_waiting -= 1
+
+    async def on_connection_create_end(
+        self, session, context: SimpleNamespace, params
+    ) -> None:
+        self.connections_created += 1
+
+    async def on_connection_reuseconn(
+        self, session, context: SimpleNamespace, params
+    ) -> None:
+        self.connections_reused += 1
+
+    async def on_dns_cache_hit(self, session, context: SimpleNamespace, params) -> None:
+        self.dns_cache_hits += 1
+
+    async def on_dns_cache_miss(
+        self, session, context: SimpleNamespace, params
+    ) -> None:
+        self.dns_cache_misses += 1
+
+
+def create_session(dev_settings, pool_stats: PoolStats) -> aiohttp.ClientSession:
+    """Creates the bot's shared HTTP session with a keep-alive connection pool
+
+    Connections are kept open between requests, so repeated calls to the same API
+    skip the TCP and TLS handshakes. The pool's size, per-host limit, keep-alive
+    timeout, and DNS cache TTL come from the bot's dev settings.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=dev_settings.http_pool_limit,
+        limit_per_host=dev_settings.http_pool_limit_per_host,
+        keepalive_timeout=dev_settings.http_keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=dev_settings.http_dns_cache_ttl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector, trace_configs=[pool_stats.create_trace_config()]
+    )
@@ -186,7 +186,9 @@ async def dev_mail(
     embed_title: str = "dev mail",
 ) -> None:
     """Sends a private message to the bot owner"""
-    user = await bot.fetch_user(bot.owner_id)
+    user: discord.User | None = await bot.resolver.get_user(bot.owner_id)
+    if user is None:
+        raise ValueError(f"The bot owner's account ({bot.owner_id}) was not found.")
     if content and use_embed:
         embed = discord.Embed(title=embed_title, description=content)
         await user.send(embed=embed, file=file)
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from types import FrameType
+
+
+class LagOffender:
+    """Holds how often and how badly one code path blocked the event loop"""
+
+    def __init__(self, description: str) -> None:
+        self.description = description
+        self.count = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_seen = 0.0
+
+    def record(self, lag: float) -> None:
+        self.count += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.last_seen = time.time()
+
+
+class LoopLagMonitor:
+    """Measures event loop scheduling lag and names what blocked the loop
+
+    A task on the loop repeatedly sleeps for a short interval and records how much
+    later than requested it woke up. A watchdog thread notices when that task has not
+    checked in for too long and captures the loop thread's stack while the loop is
+    still blocked, so each lag spike can be blamed on the code that caused it.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.25,
+        threshold: float = 0.1,
+        sample_count: int = 2400,
+        source_root: str | None = None,
+        get_running_commands=None,
+    ) -> None:
+        """Creates a LoopLagMonitor object
+
+        Parameters
+        ----------
+        interval : float
+            The number of seconds between measurements.
+        threshold : float
+            The number of seconds of lag that counts as a spike.
+        sample_count : int
+            The number of lag samples to keep in the ring buffer.
+        source_root : str | None
+            The folder of the bot's own code. Stack frames from files in this folder
+            are preferred when naming the code that blocked the loop.
+        get_running_commands : Callable[[], list[str]] | None
+            A function that returns the names of the commands currently running.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque[tuple[float, float]] = deque(maxlen=sample_count)
+        self.source_root = source_root or os.path.dirname(os.path.dirname(__file__))
+        self.get_running_commands = get_running_commands
+        self.offenders: dict[str, LagOffender] = dict()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.loop_thread_id: int | None = None
+        self.last_heartbeat = time.perf_counter()
+        self.captured_culprit: str | None = None
+        self.task: asyncio.Task | None = None
+        self.watchdog: threading.Thread | None = None
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts measuring; must be called from the event loop's thread"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_heartbeat = time.perf_counter()
+        self.task = self.loop.create_task(self.measure())
+        self.watchdog = threading.Thread(
+            target=self.watch, name="loop-lag-watchdog", daemon=True
+        )
+        self.watchdog.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    async def measure(self) -> None:
+        """A task that records the loop's lag every interval"""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.last_heartbeat = now
+            lag = max(0.0, now - start - self.interval)
+            self.samples.append((time.time(), lag))
+            if lag >= self.threshold:
+                culprit = self.captured_culprit or "unknown (too brief to capture)"
+                try:
+                    offender = self.offenders[culprit]
+                except KeyError:
+                    offender = self.offenders[culprit] = LagOffender(culprit)
+                offender.record(lag)
+            self.captured_culprit = None
+
+    def watch(self) -> None:
+        """Runs on the watchdog thread and captures the stack of a blocked loop"""
+        while not self.stopped.wait(self.threshold / 2):
+            blocked_for = time.perf_counter() - self.last_heartbeat - self.interval
+            if blocked_for >= self.threshold and self.captured_culprit is None:
+                self.captured_culprit = self.describe_blocking_code()
+
+    def describe_blocking_code(self) -> str:
+        """Describes what the loop's thread is running right now"""
+        frame = sys._current_frames().get(self.loop_thread_id)  # type: ignore
+        parts: list[str] = []
+        if frame is not None:
+            parts.append(self.describe_frames(frame))
+        task = asyncio.current_task(self.loop)
+        if task is not None:
+            coro_name = getattr(task.get_coro(), "__qualname__", "unknown coroutine")
+            parts.append(f"task {task.get_name()} ({coro_name})")
+        if self.get_running_commands is not None:
+            running_commands = self.get_running_commands()
+            if running_commands:
+                parts.append("commands running: " + ", ".join(running_commands))
+        return "; ".join(parts) or "unknown"
+
+    def describe_frames(self, frame: FrameType) -> str:
+        """Names the innermost function running and the bot code that called it"""
+        innermost = frame
+        own_frame: FrameType | None = None
+        f: FrameType | None = frame
+        while f is not None:
+            file_name = f.f_code.co_filename
+            if file_name.startswith(self.source_root) and file_name != __file__:
+                own_frame = f
+                break
+            f = f.f_back
+        description = (
+            f"in {innermost.f_code.co_name}"
+            f" ({self.relative_path(innermost.f_code.co_filename)})"
+        )
+        if own_frame is not None and own_frame is not innermost:
+            description += (
+                f" called from {self.relative_path(own_frame.f_code.co_filename)}:"
+                f"{own_frame.f_lineno} in {own_frame.f_code.co_name}"
+            )
+        return description
+
+    def relative_path(self, file_name: str) -> str:
+        if file_name.startswith(self.source_root):
+            return os.path.relpath(file_name, self.source_root)
+        return os.path.basename(file_name)
+
+    def lag_quantile(self, q: float) -> float:
+        """Returns a quantile (0 ≤ q ≤ 1) of the lag samples in the ring buffer"""
+        if not self.samples:
+            return 0.0
+        lags = sorted(lag for _, lag in self.samples)
+        return lags[min(len(lags) - 1, int(q * len(lags)))]
+
+    def worst_offenders(self, n: int = 10) -> list[LagOffender]:
+        """Returns the offenders that blocked the loop for the most total time"""
+        offenders = sorted(
+            self.offenders.values(), key=lambda o: o.total_lag, reverse=True
+        )
+        return offenders[:n]
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the lag metrics in the Prometheus text format"""
+        lines = ["# TYPE parhelion_event_loop_lag_seconds gauge"]
+        for q in ("0.5", "0.99", "1"):
+            lines.append(
+                f'parhelion_event_loop_lag_seconds{{quantile="{q}"}}'
+                f" {self.lag_quantile(float(q))}"
+            )
+        spike_count = sum(o.count for o in self.offenders.values())
+        lines.append("# TYPE parhelion_event_loop_lag_spikes_total counter")
+        lines.append(f"parhelion_event_loop_lag_spikes_total {spike_count}")
+        return lines
@@ -0,0 +1,107 @@
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from logging.handlers import RotatingFileHandler
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """A rotating file handler that leaves flushing to whoever calls it
+
+    `BatchingQueueListener` writes a batch of records with this handler and then
+    flushes once, instead of once per record.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class LocalQueueHandler(QueueHandler):
+    """A queue handler for a queue in the same process that puts records in as they are
+
+    `QueueHandler.prepare` formats each record and removes its exception info so that
+    it can be pickled, but a queue.Queue does not pickle. Skipping that leaves the
+    formatting to the listener's thread and lets each handler's formatter see the
+    exception.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BatchingQueueListener(QueueListener):
+    """A queue listener that handles records in batches on its own thread
+
+    All formatting, writing, and log rotation happens on the listener's thread, so
+    logging from the event loop only costs putting a record in a queue.
+    """
+
+    def __init__(
+        self, queue_: queue.Queue, *handlers: logging.Handler, max_batch_size: int = 200
+    ) -> None:
+        super().__init__(queue_, *handlers, respect_handler_level=True)
+        self.max_batch_size = max_batch_size
+
+    def _monitor(self) -> None:
+        q = self.queue
+        stopping = False
+        while not stopping:
+            batch: list[logging.LogRecord] = []
+            record = self.dequeue(True)
+            q.task_done()
+            if record is self._sentinel:
+                break
+            batch.append(record)
+            while len(batch) < self.max_batch_size:
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+                q.task_done()
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                batch.append(record)
+            for record in batch:
+                self.handle(record)
+            for handler in self.handlers:
+                handler.flush()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each log record as one line of JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def create_queue_logger(
+    name: str, *handlers: logging.Handler
+) -> tuple[logging.Logger, BatchingQueueListener]:
+    """Creates a logger that sends its records through a queue to handlers
+
+    The returned listener has already been started; stop it to write any remaining
+    records before the program exits.
+    """
+    log_queue: queue.Queue = queue.Queue()
+    logger = logging.getLogger(name)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    listener = BatchingQueueListener(log_queue, *handlers)
+    listener.start()
+    return logger, listener
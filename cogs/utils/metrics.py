@@ -0,0 +1,200 @@
+import time
+from bisect import bisect_left
+from typing import Callable
+
+from aiohttp import web  # https://pypi.org/project/aiohttp/
+
+
+# Upper bounds, in seconds, of the histogram buckets. The last bucket is unbounded.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    """Formats labels for the Prometheus text format, e.g. `{cog="Tags"}`"""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    """A histogram of durations in seconds with fixed buckets
+
+    Recording a value is O(log b) for b buckets and uses no extra memory, so it is
+    cheap enough to do for every command.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.bucket_counts: list[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Records one value"""
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile (0 ≤ q ≤ 1) the same way Prometheus does
+
+        The estimate is interpolated linearly within the bucket the quantile falls in.
+        Values in the unbounded bucket are estimated as the largest bucket bound.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def render_prometheus(self, name: str, labels: dict[str, str]) -> list[str]:
+        """Returns the histogram's lines in the Prometheus text format"""
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            bucket_labels = format_labels({**labels, "le": str(bound)})
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        bucket_labels = format_labels({**labels, "le": "+Inf"})
+        lines.append(f"{name}_bucket{bucket_labels} {self.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+
+class CommandStats:
+    """Holds the latency histogram and counters of one command"""
+
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.errors = 0
+        self.in_flight = 0
+
+
+class Metrics:
+    """Collects the bot's metrics and renders them in the Prometheus text format
+
+    Per-command stats are recorded with `command_started` and `command_finished`.
+    Other parts of the bot can create named histograms with `histogram` and add
+    extra lines to the output with `add_collector`.
+    """
+
+    def __init__(self) -> None:
+        self.commands: dict[tuple[str, str], CommandStats] = dict()
+        self.histograms: dict[str, Histogram] = dict()
+        self.collectors: list[Callable[[], list[str]]] = []
+
+    def command_started(self, ctx) -> None:
+        """Marks the start of a command invocation"""
+        ctx.metrics_start_time = time.perf_counter()
+        self.get_command_stats(ctx).in_flight += 1
+
+    def command_finished(self, ctx, failed: bool) -> None:
+        """Records a command invocation's latency and whether it failed
+
+        Does nothing if `command_started` was not called for ctx, such as when a
+        check failed before the command was invoked.
+        """
+        start_time: float | None = getattr(ctx, "metrics_start_time", None)
+        if start_time is None:
+            return
+        ctx.metrics_start_time = None
+        stats = self.get_command_stats(ctx)
+        stats.in_flight -= 1
+        stats.latency.observe(time.perf_counter() - start_time)
+        if failed:
+            stats.errors += 1
+
+    def get_command_stats(self, ctx) -> CommandStats:
+        """Gets the stats of ctx.command, creating them if needed"""
+        key = (ctx.command.cog_name or "", ctx.command.qualified_name)
+        try:
+            return self.commands[key]
+        except KeyError:
+            stats = self.commands[key] = CommandStats()
+            return stats
+
+    def histogram(self, name: str) -> Histogram:
+        """Gets a named histogram, creating it if needed
+
+        The name is used as the metric name, so it should end with a unit such as
+        `_seconds`.
+        """
+        try:
+            return self.histograms[name]
+        except KeyError:
+            histogram = self.histograms[name] = Histogram()
+            return histogram
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        """Adds a function that returns extra lines in the Prometheus text format"""
+        self.collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        """Returns all the metrics in the Prometheus text format"""
+        lines = ["# TYPE parhelion_command_duration_seconds histogram"]
+        for (cog, command), stats in self.commands.items():
+            labels = {"cog": cog, "command": command}
+            lines.extend(
+                stats.latency.render_prometheus(
+                    "parhelion_command_duration_seconds", labels
+                )
+            )
+        lines.append("# TYPE parhelion_command_errors_total counter")
+        for (cog, command), stats in self.commands.items():
+            labels_str = format_labels({"cog": cog, "command": command})
+            lines.append(f"parhelion_command_errors_total{labels_str} {stats.errors}")
+        lines.append("# TYPE parhelion_commands_in_flight gauge")
+        for (cog, command), stats in self.commands.items():
+            labels_str = format_labels({"cog": cog, "command": command})
+            lines.append(f"parhelion_commands_in_flight{labels_str} {stats.in_flight}")
+        for name, histogram in self.histograms.items():
+            lines.append(f"# TYPE parhelion_{name} histogram")
+            lines.extend(histogram.render_prometheus(f"parhelion_{name}", dict()))
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(metrics: Metrics, host: str, port: int) -> web.AppRunner:
+    """Serves the metrics at http://host:port/metrics for Prometheus to scrape"""
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=metrics.render_prometheus(),
+            content_type="text/plain",
+            charset="utf-8",
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,80 @@
+import os
+import re
+
+import asyncpg  # https://pypi.org/project/asyncpg/
+
+
+MIGRATIONS_FOLDER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "migrations"
+)
+# Any number works as long as nothing else uses the same advisory lock.
+MIGRATION_LOCK_ID = 80_211_903
+MIGRATION_FILE_NAME_REGEX = re.compile(r"^(\d+)_\w+\.sql$")
+
+
+def find_migrations(folder_path: str = MIGRATIONS_FOLDER_PATH) -> list[tuple[int, str]]:
+    """Returns the version numbers and paths of the migration files, in order
+
+    Migration files are named like `0001_initial_schema.sql`. Raises ValueError if two
+    files have the same version number.
+    """
+    migrations: dict[int, str] = dict()
+    for file_name in os.listdir(folder_path):
+        match = MIGRATION_FILE_NAME_REGEX.match(file_name)
+        if match is None:
+            continue
+        version = int(match[1])
+        if version in migrations:
+            raise ValueError(f"Two migrations have the version number {version}.")
+        migrations[version] = os.path.join(folder_path, file_name)
+    return sorted(migrations.items())
+
+
+async def run_migrations(
+    db: asyncpg.Pool, folder_path: str = MIGRATIONS_FOLDER_PATH
+) -> list[str]:
+    """Applies the migrations that have not been applied to the database yet
+
+    Each migration runs in its own transaction and is recorded in the
+    schema_migrations table. An advisory lock makes other processes, such as the other
+    clusters, wait until the migrations are done instead of running them twice.
+    Returns the names of the migrations applied.
+    """
+    applied_names: list[str] = []
+    async with db.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1);", MIGRATION_LOCK_ID)
+        try:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                """
+            )
+            applied_versions: set[int] = {
+                r["version"]
+                for r in await conn.fetch("SELECT version FROM schema_migrations;")
+            }
+            for version, path in find_migrations(folder_path):
+                if version in applied_versions:
+                    continue
+                name = os.path.basename(path)
+                with open(path, "r", encoding="utf8") as file:
+                    sql = file.read()
+                async with conn.transaction():
+                    await conn.execute(sql)
+                    await conn.execute(
+                        """
+                        INSERT INTO schema_migrations
+                        (version, name)
+                        VALUES ($1, $2);
+                        """,
+                        version,
+                        name,
+                    )
+                applied_names.append(name)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1);", MIGRATION_LOCK_ID)
+    return applied_names
@@ -0,0 +1,382 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
+
+import asyncpg  # https://pypi.org/project/asyncpg/
+import discord  # https://pypi.org/project/discord.py/
+
+from cogs.utils.io import LinkButton
+
+
+class OutboxMessage:
+    """A scheduled message that is due and should be sent through the outbox"""
+
+    def __init__(
+        self,
+        kind: str,
+        due_time: datetime,
+        is_dm: bool,
+        destination_id: int,
+        server_id: int,
+        *,
+        priority: int = 0,
+        content: str | None = None,
+        embed: discord.Embed | None = None,
+        link_label: str | None = None,
+        link_url: str | None = None,
+    ) -> None:
+        """Creates an OutboxMessage object
+
+        Parameters
+        ----------
+        kind : str
+            What the message is, such as "reminder". Used in logs and metrics.
+        due_time : datetime
+            When the message was scheduled to be sent.
+        is_dm : bool
+            Whether destination_id is a user ID instead of a channel ID.
+        destination_id : int
+            The ID of the user or channel to send the message to.
+        server_id : int
+            The ID of the destination's server, or 0 for DMs. Decides which cluster
+            sends the message.
+        priority : int
+            Messages with lower priorities are sent first when many are waiting.
+        content : str | None
+            The message's text.
+        embed : discord.Embed | None
+            The message's embed.
+        link_label : str | None
+            The label of a link button to add to the message.
+        link_url : str | None
+            The URL of the link button. The button is only added if both link_label
+            and link_url are given.
+        """
+        self.kind = kind
+        self.due_time = due_time
+        self.is_dm = is_dm
+        self.destination_id = destination_id
+        self.server_id = server_id
+        self.priority = priority
+        self.content = content
+        self.embed = embed
+        self.link_label = link_label
+        self.link_url = link_url
+
+
+class Outbox:
+    """Durably sends scheduled messages while staying under Discord's rate limits
+
+    Messages are saved to the outbox table (with `enqueue`, ideally in the same
+    transaction that consumes whatever scheduled them) and deleted only after they are
+    sent or can never be sent, so a restart or a failed send does not lose them.
+    Delivery is at least once: a message sent just before a crash, but not yet
+    deleted, is sent again after the restart. The sender drains the table in order of
+    priority and then of due time, spacing sends to each channel and sends overall so
+    that a backlog, such as the messages missed during downtime, does not cause a burst
+    of 429 responses. A 429 pushes back the channel (or every channel, if the limit is
+    global) by its Retry-After time, and other temporary errors are retried with
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        bot,
+        *,
+        concurrency: int = 10,
+        global_rate: float = 25,
+        channel_interval: float = 1,
+        batch_size: int = 100,
+        max_attempts: int = 8,
+        base_backoff: float = 5,
+    ) -> None:
+        """Creates an Outbox object
+
+        Parameters
+        ----------
+        bot
+            The bot.
+        concurrency : int
+            The most messages to send at the same time.
+        global_rate : float
+            The most messages to send per second overall. Discord's global limit is 50
+            requests per second, and the rest of the bot needs some of that.
+        channel_interval : float
+            The fewest seconds between two messages sent to the same channel or user.
+        batch_size : int
+            The most messages to load from the database at once.
+        max_attempts : int
+            The number of failed attempts after which a message is dropped.
+        base_backoff : float
+            The number of seconds to wait before retrying a message the first time.
+            The wait doubles with each attempt.
+        """
+        self.bot = bot
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.send_interval = 1 / global_rate
+        self.channel_interval = channel_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.next_send_time = 0.0  # In the time.monotonic clock.
+        self.next_channel_send_times: dict[int, float] = dict()
+        self.wake_event = asyncio.Event()
+        self.sent_count = 0
+        self.retry_count = 0
+        self.dropped_count = 0
+        self.rate_limited_count = 0
+
+    async def enqueue(
+        self, conn: asyncpg.Connection | asyncpg.Pool, messages: list[OutboxMessage]
+    ) -> None:
+        """Saves messages to the outbox table
+
+        Call `wake` after the transaction, if any, is committed.
+        """
+        if not messages:
+            return
+        await conn.executemany(
+            """
+            INSERT INTO outbox
+            (kind, priority, due_time, next_attempt_at, is_dm, destination_id,
+                server_id, content, embed, link_label, link_url)
+            VALUES ($1, $2, $3, $3, $4, $5, $6, $7, $8, $9, $10);
+            """,
+            [
+                (
+                    m.kind,
+                    m.priority,
+                    m.due_time,
+                    m.is_dm,
+                    m.destination_id,
+                    m.server_id,
+                    m.content,
+                    json.dumps(m.embed.to_dict()) if m.embed else None,
+                    m.link_label,
+                    m.link_url,
+                )
+                for m in messages
+            ],
+        )
+
+    def wake(self) -> None:
+        """Makes the sender check the outbox table now"""
+        self.wake_event.set()
+
+    async def run(self) -> None:
+        """A task that sends the messages in the outbox table as they become ready"""
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                self.wake_event.clear()
+                records = await self.load_ready_messages()
+                if not records:
+                    await self.wait_for_messages()
+                    continue
+                await self.send_batch(records)
+            except Exception as error:
+                # Any error, such as a lost connection, only pauses sending.
+                print(f"  Outbox.run {error = }")  # noqa: E251, E202
+                await asyncio.sleep(30)
+
+    async def load_ready_messages(self) -> list[asyncpg.Record]:
+        """Gets the next messages this cluster should send, most important first"""
+        shard_count, shard_ids = self.bot.get_shard_filter()
+        return await self.bot.db.fetch(
+            """
+            SELECT *
+            FROM outbox
+            WHERE next_attempt_at <= NOW()
+                AND ((server_id >> 22) % $1) = ANY($2)
+            ORDER BY priority, due_time
+            LIMIT $3;
+            """,
+            shard_count,
+            shard_ids,
+            self.batch_size,
+        )
+
+    async def wait_for_messages(self) -> None:
+        """Waits until a message might be ready or `wake` is called"""
+        shard_count, shard_ids = self.bot.get_shard_filter()
+        next_attempt_at: datetime | None = await self.bot.db.fetchval(
+            """
+            SELECT MIN(next_attempt_at)
+            FROM outbox
+            WHERE ((server_id >> 22) % $1) = ANY($2);
+            """,
+            shard_count,
+            shard_ids,
+        )
+        timeout = None
+        if next_attempt_at is not None:
+            timeout = (next_attempt_at - datetime.now(timezone.utc)).total_seconds()
+            if timeout <= 0:
+                return
+        try:
+            await asyncio.wait_for(self.wake_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def send_batch(self, records: list[asyncpg.Record]) -> None:
+        """Sends messages and then deletes the finished ones with one query
+
+        An unexpected error only affects the message it was raised for, so the messages
+        already sent are still deleted instead of being sent again.
+        """
+        results = await asyncio.gather(
+            *(self.send_or_retry(r) for r in records), return_exceptions=True
+        )
+        finished_ids: list[int] = []
+        for r, result in zip(records, results):
+            if isinstance(result, BaseException):
+                # Retrying failed too, so the message is tried again in the next batch.
+                print(f"  Outbox.send_batch {result = }")  # noqa: E251, E202
+            elif result:
+                finished_ids.append(r["id"])
+        if finished_ids:
+            await self.bot.db.execute(
+                """
+                DELETE FROM outbox
+                WHERE id = ANY($1);
+                """,
+                finished_ids,
+            )
+
+    async def send_or_retry(self, r: asyncpg.Record) -> bool:
+        """Sends one message, rescheduling it if sending raises an unexpected error"""
+        try:
+            return await self.send(r)
+        except Exception as error:
+            print(f"  Outbox.send {error = }")  # noqa: E251, E202
+            return await self.retry(r, error)
+
+    async def send(self, r: asyncpg.Record) -> bool:
+        """Sends one message; returns False if it was rescheduled to be retried"""
+        view = None
+        if r["link_label"] and r["link_url"]:
+            view = LinkButton(r["link_label"], r["link_url"])
+        embed = None
+        if r["embed"]:
+            embed = discord.Embed.from_dict(json.loads(r["embed"]))
+        try:
+            if r["is_dm"]:
+                destination = await self.bot.resolver.get_user(r["destination_id"])
+            else:
+                destination = await self.bot.resolver.get_channel(r["destination_id"])
+            if destination is None:
+                return self.drop(r, "its destination was not found")
+            # The wait is outside the semaphore so that messages waiting for a busy
+            # channel do not hold up the messages for other channels.
+            await asyncio.sleep(self.reserve_send_time(r["destination_id"]))
+            async with self.semaphore:
+                await destination.send(r["content"], embed=embed, view=view)
+        except discord.Forbidden:
+            return self.drop(r, "the bot is not allowed to send it")
+        except discord.HTTPException as error:
+            if error.status == 429:
+                self.rate_limited_count += 1
+                delay = self.push_back(r["destination_id"], error)
+                return await self.retry(r, error, delay)
+            if error.status >= 500:
+                return await self.retry(r, error)
+            return self.drop(r, f"{type(error).__name__}: {error}")
+        except OSError as error:
+            return await self.retry(r, error)
+        self.sent_count += 1
+        lateness = (datetime.now(timezone.utc) - r["due_time"]).total_seconds()
+        self.bot.metrics.histogram(f"{r['kind']}_lateness_seconds").observe(
+            max(0.0, lateness)
+        )
+        return True
+
+    def reserve_send_time(self, destination_id: int) -> float:
+        """Claims the next free send slot for a destination
+
+        Returns the number of seconds to wait before sending. The slot is claimed
+        right away, so concurrent sends to the same channel are spaced out instead of
+        all waiting for the same moment.
+        """
+        now = time.monotonic()
+        send_time = max(
+            now,
+            self.next_send_time,
+            self.next_channel_send_times.get(destination_id, 0.0),
+        )
+        self.next_send_time = send_time + self.send_interval
+        self.next_channel_send_times[destination_id] = send_time + self.channel_interval
+        if len(self.next_channel_send_times) > 10_000:
+            self.next_channel_send_times = {
+                id_: t for id_, t in self.next_channel_send_times.items() if t > now
+            }
+        return send_time - now
+
+    def push_back(self, destination_id: int, error: discord.HTTPException) -> float:
+        """Delays future sends after a 429 response; returns the Retry-After seconds"""
+        headers: Any = getattr(error.response, "headers", None) or dict()
+        try:
+            retry_after = float(headers.get("Retry-After", self.base_backoff))
+        except ValueError:
+            retry_after = self.base_backoff
+        resume_time = time.monotonic() + retry_after
+        if headers.get("X-RateLimit-Global") == "true":
+            self.next_send_time = max(self.next_send_time, resume_time)
+        self.next_channel_send_times[destination_id] = max(
+            self.next_channel_send_times.get(destination_id, 0.0), resume_time
+        )
+        return retry_after
+
+    async def retry(
+        self, r: asyncpg.Record, error: Exception, delay: float | None = None
+    ) -> bool:
+        """Reschedules a message that failed to send, or drops it after too many tries
+
+        If delay is None, the delay grows exponentially with the number of attempts.
+        """
+        attempts = r["attempts"] + 1
+        error_text = f"{type(error).__name__}: {error}"
+        if attempts >= self.max_attempts:
+            return self.drop(r, f"it failed {attempts} times, last with {error_text}")
+        if delay is None:
+            delay = self.base_backoff * 2 ** r["attempts"]
+        self.retry_count += 1
+        await self.bot.db.execute(
+            """
+            UPDATE outbox
+            SET attempts = $2,
+                next_attempt_at = $3,
+                last_error = $4
+            WHERE id = $1;
+            """,
+            r["id"],
+            attempts,
+            datetime.now(timezone.utc) + timedelta(seconds=delay),
+            error_text,
+        )
+        return False
+
+    def drop(self, r: asyncpg.Record, reason: str) -> bool:
+        """Logs that a message will never be sent; returns True so it is deleted"""
+        self.dropped_count += 1
+        message = f"Dropped {r['kind']} {r['id']} because {reason}"
+        # The logger is set up once the bot is ready, which may be after sending starts.
+        if self.bot.logger is not None:
+            self.bot.logger.warning(message)
+        else:
+            print(f"  Outbox.drop: {message}")
+        return True
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the outbox's counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_outbox_messages_total counter",
+            f'parhelion_outbox_messages_total{{result="sent"}} {self.sent_count}',
+            f'parhelion_outbox_messages_total{{result="retried"}} {self.retry_count}',
+            f'parhelion_outbox_messages_total{{result="dropped"}} {self.dropped_count}',
+            "# TYPE parhelion_outbox_rate_limited_total counter",
+            f"parhelion_outbox_rate_limited_total {self.rate_limited_count}",
+        ]
@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable
+from typing import Callable
+
+from cogs.utils.common import get_support_server_role_ids
+
+
+class QuotaService:
+    """Keeps the numbers of things users own so that limit checks skip the database
+
+    Each user's count for a category, such as "reminders", is loaded with the
+    category's counter the first time it is needed and then kept up to date by the cogs
+    with `adjust` and `set_count` when they create or delete things. Counts expire
+    after a while so that changes made by other clusters are picked up eventually.
+    Whether a user is a member, which means having one of the membership roles in the
+    support server, is cached the same way.
+    """
+
+    def __init__(
+        self,
+        bot,
+        *,
+        count_ttl: float = 600,
+        membership_ttl: float = 300,
+        max_size: int = 50_000,
+    ) -> None:
+        """Creates a QuotaService object
+
+        Parameters
+        ----------
+        bot
+            The bot.
+        count_ttl : float
+            The number of seconds to trust a cached count.
+        membership_ttl : float
+            The number of seconds to trust a cached membership status.
+        max_size : int
+            The number of counts and the number of membership statuses to cache.
+        """
+        self.bot = bot
+        self.count_ttl = count_ttl
+        self.membership_ttl = membership_ttl
+        self.max_size = max_size
+        self.counters: dict[str, Callable[[int], Awaitable[int]]] = dict()
+        self.counts: OrderedDict[tuple[str, int], tuple[float, int]] = OrderedDict()
+        self.memberships: OrderedDict[int, tuple[float, bool]] = OrderedDict()
+        self.count_hits = 0
+        self.count_misses = 0
+        self.membership_hits = 0
+        self.membership_misses = 0
+
+    def register(self, category: str, counter: Callable[[int], Awaitable[int]]) -> None:
+        """Sets the coroutine function that counts a user's things in a category"""
+        self.counters[category] = counter
+
+    async def get_count(self, category: str, user_id: int) -> int:
+        """Gets the number of things in a category that a user owns"""
+        key = (category, user_id)
+        cached = self.counts.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self.counts.move_to_end(key)
+            self.count_hits += 1
+            return cached[1]
+        self.count_misses += 1
+        count = await self.counters[category](user_id)
+        self.set_count(category, user_id, count)
+        return count
+
+    def set_count(self, category: str, user_id: int, count: int) -> None:
+        """Caches the number of things in a category that a user owns"""
+        key = (category, user_id)
+        self.counts[key] = (time.monotonic() + self.count_ttl, count)
+        self.counts.move_to_end(key)
+        while len(self.counts) > self.max_size:
+            self.counts.popitem(last=False)
+
+    def adjust(self, category: str, user_id: int, delta: int) -> None:
+        """Changes a user's cached count, if there is one, by delta"""
+        key = (category, user_id)
+        cached = self.counts.get(key)
+        if cached is not None:
+            self.counts[key] = (cached[0], max(0, cached[1] + delta))
+
+    def invalidate(self, category: str, user_id: int) -> None:
+        """Forgets a user's count so that it is loaded again the next time"""
+        self.counts.pop((category, user_id), None)
+
+    async def is_member(self, user_id: int) -> bool:
+        """Whether a user has one of the membership roles in the support server"""
+        if not self.bot.dev_settings.support_server_id:
+            return False
+        cached = self.memberships.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            self.memberships.move_to_end(user_id)
+            self.membership_hits += 1
+            return cached[1]
+        self.membership_misses += 1
+        membership_role_ids: list[int] = self.bot.dev_settings.membership_role_ids
+        is_member = any(
+            role_id in membership_role_ids
+            for role_id in await get_support_server_role_ids(self.bot, user_id)
+        )
+        self.memberships[user_id] = (time.monotonic() + self.membership_ttl, is_member)
+        self.memberships.move_to_end(user_id)
+        while len(self.memberships) > self.max_size:
+            self.memberships.popitem(last=False)
+        return is_member
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the cache counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_quota_cache_total counter",
+            f'parhelion_quota_cache_total{{cache="count",result="hit"}}'
+            f" {self.count_hits}",
+            f'parhelion_quota_cache_total{{cache="count",result="miss"}}'
+            f" {self.count_misses}",
+            f'parhelion_quota_cache_total{{cache="membership",result="hit"}}'
+            f" {self.membership_hits}",
+            f'parhelion_quota_cache_total{{cache="membership",result="miss"}}'
+            f" {self.membership_misses}",
+        ]
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+
+import discord  # https://pypi.org/project/discord.py/
+
+
+class EntityResolver:
+    """Turns user, channel, and server IDs into objects without crashing on cold caches
+
+    The gateway cache is checked first. If the entity is not there, it is fetched over
+    REST; concurrent requests for the same entity share one fetch. Fetched entities
+    are kept in an LRU cache until their TTL expires, and entities that do not exist or
+    cannot be accessed are cached as None for a shorter TTL.
+    """
+
+    def __init__(
+        self,
+        bot,
+        *,
+        ttl: float = 600,
+        negative_ttl: float = 60,
+        max_size: int = 4096,
+    ) -> None:
+        """Creates an EntityResolver object
+
+        Parameters
+        ----------
+        bot
+            The bot.
+        ttl : float
+            The number of seconds to cache a fetched entity.
+        negative_ttl : float
+            The number of seconds to remember that an entity could not be fetched.
+        max_size : int
+            The number of fetched entities and failed fetches to cache.
+        """
+        self.bot = bot
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.cache: OrderedDict[tuple[str, int], tuple[float, Any]] = OrderedDict()
+        self.pending: dict[tuple[str, int], asyncio.Task] = dict()
+        self.gateway_hits = 0
+        self.cache_hits = 0
+        self.fetches = 0
+
+    async def get_user(self, user_id: int) -> discord.User | None:
+        """Gets a user, or None if the user does not exist"""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.gateway_hits += 1
+            return user
+        return await self.resolve("user", user_id, self.bot.fetch_user)
+
+    async def get_channel(
+        self, channel_id: int
+    ) -> discord.abc.GuildChannel | discord.Thread | discord.abc.PrivateChannel | None:
+        """Gets a channel, or None if it does not exist or the bot cannot see it"""
+        channel = self.bot.get_channel(channel_id)
+        if channel is not None:
+            self.gateway_hits += 1
+            return channel
+        return await self.resolve("channel", channel_id, self.bot.fetch_channel)
+
+    async def get_server(self, server_id: int) -> discord.Guild | None:
+        """Gets a server, or None if it does not exist or the bot is not in it"""
+        server = self.bot.get_guild(server_id)
+        if server is not None:
+            self.gateway_hits += 1
+            return server
+        return await self.resolve("server", server_id, self.bot.fetch_guild)
+
+    async def resolve(
+        self, kind: str, id_: int, fetch: Callable[[int], Awaitable[Any]]
+    ) -> Any:
+        """Gets an entity from the cache or with one shared call of fetch"""
+        key = (kind, id_)
+        cached = self.cache.get(key)
+        if cached is not None:
+            expires_at, entity = cached
+            if expires_at > time.monotonic():
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                return entity
+            del self.cache[key]
+        task = self.pending.get(key)
+        if task is None:
+            task = self.pending[key] = asyncio.create_task(self.fetch(key, fetch))
+        return await asyncio.shield(task)
+
+    async def fetch(
+        self, key: tuple[str, int], fetch: Callable[[int], Awaitable[Any]]
+    ) -> Any:
+        """Fetches an entity over REST and caches the result
+
+        Errors other than the entity not existing or being inaccessible are raised and
+        not cached.
+        """
+        self.fetches += 1
+        try:
+            try:
+                entity = await fetch(key[1])
+                ttl = self.ttl
+            except (discord.NotFound, discord.Forbidden):
+                entity = None
+                ttl = self.negative_ttl
+            self.cache[key] = (time.monotonic() + ttl, entity)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+            return entity
+        finally:
+            del self.pending[key]
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the resolver's counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_entity_resolver_total counter",
+            f'parhelion_entity_resolver_total{{result="gateway"}} {self.gateway_hits}',
+            f'parhelion_entity_resolver_total{{result="cache"}} {self.cache_hits}',
+            f'parhelion_entity_resolver_total{{result="fetch"}} {self.fetches}',
+            "# TYPE parhelion_entity_resolver_cache_size gauge",
+            f"parhelion_entity_resolver_cache_size {len(self.cache)}",
+        ]
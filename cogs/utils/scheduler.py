@@ -0,0 +1,93 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+from datetime import timezone
+from typing import Generic
+from typing import Hashable
+from typing import TypeVar
+
+
+Key = TypeVar("Key", bound=Hashable)
+
+
+class TimerHeap(Generic[Key]):
+    """A min-heap of timers keyed by when they are due
+
+    Pushing a timer is O(log n). Cancelling is O(1): the timer is forgotten right away
+    and its heap entry is discarded when it reaches the top. One task can wait for the
+    next due timers with `wait_for_due`, which wakes up early if an earlier timer is
+    pushed.
+    """
+
+    def __init__(self) -> None:
+        self.heap: list[tuple[datetime, int, Key]] = []
+        self.due_times: dict[Key, datetime] = dict()
+        self.counter = itertools.count()  # Breaks ties without comparing keys.
+        self.changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.due_times)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self.due_times
+
+    def push(self, key: Key, due_time: datetime) -> None:
+        """Adds a timer, or reschedules it if a timer with the same key exists"""
+        self.due_times[key] = due_time
+        heapq.heappush(self.heap, (due_time, next(self.counter), key))
+        if self.heap[0][2] == key:
+            self.changed.set()
+        if len(self.heap) > 2 * len(self.due_times) + 64:
+            self.compact()
+
+    def cancel(self, key: Key) -> bool:
+        """Removes a timer; returns whether there was one to remove"""
+        return self.due_times.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self.heap.clear()
+        self.due_times.clear()
+        self.changed.set()
+
+    def peek(self) -> tuple[datetime, Key] | None:
+        """Returns the due time and key of the next timer, or None if there are none"""
+        while self.heap:
+            due_time, _, key = self.heap[0]
+            if self.due_times.get(key) == due_time:
+                return due_time, key
+            heapq.heappop(self.heap)  # The timer was cancelled or rescheduled.
+        return None
+
+    def pop_due(self, now: datetime) -> list[Key]:
+        """Removes and returns the keys of the timers due at or before now"""
+        keys: list[Key] = []
+        while (head := self.peek()) is not None and head[0] <= now:
+            heapq.heappop(self.heap)
+            del self.due_times[head[1]]
+            keys.append(head[1])
+        return keys
+
+    def compact(self) -> None:
+        """Rebuilds the heap without the entries of cancelled timers"""
+        self.heap = [
+            entry for entry in self.heap if self.due_times.get(entry[2]) == entry[0]
+        ]
+        heapq.heapify(self.heap)
+
+    async def wait_for_due(self) -> list[Key]:
+        """Waits until at least one timer is due and then removes and returns them"""
+        while True:
+            self.changed.clear()
+            head = self.peek()
+            if head is None:
+                await self.changed.wait()
+                continue
+            now = datetime.now(timezone.utc)
+            delay = (head[0] - now).total_seconds()
+            if delay <= 0:
+                return self.pop_due(now)
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,42 @@
+import math
+
+import aiohttp  # https://pypi.org/project/aiohttp/
+
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def get_cluster_shard_ids(
+    shard_count: int, cluster_count: int, cluster_id: int
+) -> list[int]:
+    """Returns the contiguous range of shard IDs that one cluster runs
+
+    The shards are split as evenly as possible, so the clusters' ranges differ in size
+    by at most one shard.
+    """
+    if not 0 <= cluster_id < cluster_count:
+        raise ValueError(f"cluster ID {cluster_id} is not in [0, {cluster_count})")
+    if cluster_count > shard_count:
+        raise ValueError("There cannot be more clusters than shards.")
+    start = math.floor(shard_count * cluster_id / cluster_count)
+    end = math.floor(shard_count * (cluster_id + 1) / cluster_count)
+    return list(range(start, end))
+
+
+def get_shard_id(server_id: int, shard_count: int) -> int:
+    """Returns the ID of the shard that receives a server's events
+
+    Direct messages are always received by shard 0, which matches the server ID 0
+    used for reminders and daily quotes in DMs.
+    """
+    return (server_id >> 22) % shard_count
+
+
+async def fetch_recommended_shard_count(token: str) -> int:
+    """Asks Discord how many shards the bot should use"""
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data["shards"]
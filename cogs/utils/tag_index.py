@@ -0,0 +1,185 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
+
+import asyncpg  # https://pypi.org/project/asyncpg/
+
+
+class ServerTags:
+    """One server's tags, found by lowercase name or by ID
+
+    Each tag is a dict with the keys "id", "name", "parent_tag_id", "content", and
+    "file_url". An alias has its parent tag's content and file URL.
+    """
+
+    def __init__(self, expires_at: float, records: list[asyncpg.Record]) -> None:
+        self.expires_at = expires_at
+        self.by_name: dict[str, dict[str, Any]] = dict()
+        self.by_id: dict[int, dict[str, Any]] = dict()
+        parents = {r["id"]: r for r in records if r["parent_tag_id"] is None}
+        for r in records:
+            self.add(r, parents.get(r["parent_tag_id"]))
+
+    def add(self, record: asyncpg.Record, parent: asyncpg.Record | None = None) -> None:
+        """Adds a tag, or an alias if parent is its parent tag"""
+        if record["parent_tag_id"] is not None and parent is None:
+            return  # The alias's parent tag does not exist.
+        source = record if parent is None else parent
+        tag = {
+            "id": record["id"],
+            "name": record["name"],
+            "parent_tag_id": record["parent_tag_id"],
+            "content": source["content"],
+            "file_url": source["file_url"],
+        }
+        # Tag names are compared with LOWER in the database too.
+        self.by_name[record["name"].lower()] = tag
+        self.by_id[record["id"]] = tag
+
+    def edit(self, tag_id: int, content: str, file_url: str | None) -> None:
+        """Changes the content and file URL of a tag and its aliases"""
+        for tag in self.by_id.values():
+            if tag_id in (tag["id"], tag["parent_tag_id"]):
+                tag["content"] = content
+                tag["file_url"] = file_url
+
+    def remove(self, tag_id: int) -> None:
+        """Removes a tag and its aliases"""
+        alias_ids = [
+            t["id"] for t in self.by_id.values() if t["parent_tag_id"] == tag_id
+        ]
+        for id_ in [tag_id, *alias_ids]:
+            tag = self.by_id.pop(id_, None)
+            if tag is not None and self.by_name.get(tag["name"].lower()) is tag:
+                del self.by_name[tag["name"].lower()]
+
+
+class TagIndex:
+    """An in-memory index of each server's tags so that viewing a tag skips the database
+
+    A server's tags are loaded with one query the first time one of them is needed.
+    Aliases are stored with their parent tag's content, so showing a tag or an alias
+    is one dictionary lookup. The tags commands update the index when they create,
+    edit, alias, or delete tags. Owners are not indexed, so claiming and transferring
+    tags do not change it. Only the cluster that has a server changes its tags, but
+    servers' entries still expire after a while in case the database is changed some
+    other way.
+    """
+
+    def __init__(self, *, ttl: float = 3600, max_servers: int = 1000) -> None:
+        """Creates a TagIndex object
+
+        Parameters
+        ----------
+        ttl : float
+            The number of seconds to keep a server's tags.
+        max_servers : int
+            The number of servers whose tags to keep.
+        """
+        self.ttl = ttl
+        self.max_servers = max_servers
+        self.servers: OrderedDict[int, ServerTags] = OrderedDict()
+        self.loading: dict[int, asyncio.Task] = dict()
+        self.changed_while_loading: set[int] = set()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self, db: asyncpg.Pool, server_id: int, name: str
+    ) -> dict[str, Any] | None:
+        """Finds a tag or alias by name, not case-sensitive"""
+        server_tags = await self.get_server_tags(db, server_id)
+        return server_tags.by_name.get(name.lower())
+
+    async def get_by_id(
+        self, db: asyncpg.Pool, server_id: int, tag_id: int
+    ) -> dict[str, Any] | None:
+        """Finds a tag or alias by ID"""
+        server_tags = await self.get_server_tags(db, server_id)
+        return server_tags.by_id.get(tag_id)
+
+    async def get_server_tags(self, db: asyncpg.Pool, server_id: int) -> ServerTags:
+        """Gets a server's tags, loading them if they are not in memory
+
+        Commands that need the same server's tags while they are loading wait for the
+        same query.
+        """
+        server_tags = self.servers.get(server_id)
+        if server_tags is not None and server_tags.expires_at > time.monotonic():
+            self.servers.move_to_end(server_id)
+            self.hits += 1
+            return server_tags
+        self.misses += 1
+        task = self.loading.get(server_id)
+        if task is None:
+            task = asyncio.create_task(self.load(db, server_id))
+            self.loading[server_id] = task
+        # Shielded so that a cancelled command does not cancel the load for the others.
+        return await asyncio.shield(task)
+
+    async def load(self, db: asyncpg.Pool, server_id: int) -> ServerTags:
+        """Loads a server's tags from the database and keeps them"""
+        try:
+            records = await db.fetch(
+                """
+                SELECT id, name, parent_tag_id, content, file_url
+                FROM tags
+                WHERE server_id = $1;
+                """,
+                server_id,
+            )
+        finally:
+            del self.loading[server_id]
+            is_outdated = server_id in self.changed_while_loading
+            self.changed_while_loading.discard(server_id)
+        server_tags = ServerTags(time.monotonic() + self.ttl, records)
+        if is_outdated:
+            # The records may be from before the change, so load them again next time.
+            return server_tags
+        self.servers[server_id] = server_tags
+        self.servers.move_to_end(server_id)
+        while len(self.servers) > self.max_servers:
+            self.servers.popitem(last=False)
+        return server_tags
+
+    def add(
+        self,
+        server_id: int,
+        record: asyncpg.Record,
+        parent: asyncpg.Record | None = None,
+    ) -> None:
+        """Adds a new tag, or an alias if parent is its parent tag"""
+        if server_tags := self.get_loaded(server_id):
+            server_tags.add(record, parent)
+
+    def edit(
+        self, server_id: int, tag_id: int, content: str, file_url: str | None
+    ) -> None:
+        """Changes the content and file URL of a tag and its aliases"""
+        if server_tags := self.get_loaded(server_id):
+            server_tags.edit(tag_id, content, file_url)
+
+    def remove(self, server_id: int, tag_id: int) -> None:
+        """Removes a deleted tag and its aliases, or a deleted alias"""
+        if server_tags := self.get_loaded(server_id):
+            server_tags.remove(tag_id)
+
+    def get_loaded(self, server_id: int) -> ServerTags | None:
+        """Gets a server's tags for a change, if they are in memory
+
+        If the server's tags are loading, the load is marked as outdated.
+        """
+        if server_id in self.loading:
+            self.changed_while_loading.add(server_id)
+        return self.servers.get(server_id)
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the index's counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_tag_index_total counter",
+            f'parhelion_tag_index_total{{result="hit"}} {self.hits}',
+            f'parhelion_tag_index_total{{result="miss"}} {self.misses}',
+            "# TYPE parhelion_tag_index_servers gauge",
+            f"parhelion_tag_index_servers {len(self.servers)}",
+        ]
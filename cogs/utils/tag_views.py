@@ -0,0 +1,115 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from datetime import timezone
+
+
+class TagViewCounter:
+    """Counts tag views in memory and saves them in batches
+
+    Views are counted per hour, tag, and viewer. Each flush adds them to the
+    tag_view_rollups table and to the tags' total view counts with one statement, so
+    viewing a tag does not lock its row. Views that have not been saved yet are lost
+    if the bot crashes.
+    """
+
+    def __init__(self, bot, *, flush_interval: float = 30) -> None:
+        """Creates a TagViewCounter object
+
+        Parameters
+        ----------
+        bot
+            The bot.
+        flush_interval : float
+            The number of seconds between flushes.
+        """
+        self.bot = bot
+        self.flush_interval = flush_interval
+        # The keys are (hour, tag ID, server ID, viewer ID).
+        self.pending: Counter[tuple[datetime, int, int, int]] = Counter()
+        self.flush_lock = asyncio.Lock()
+        self.view_count = 0
+        self.saved_count = 0
+
+    def add(self, tag_id: int, server_id: int, viewer_id: int) -> None:
+        """Counts one view of a tag"""
+        hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.pending[(hour, tag_id, server_id, viewer_id)] += 1
+        self.view_count += 1
+
+    async def run(self) -> None:
+        """A task that flushes the counts periodically"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                print(f"  TagViewCounter.run {error = }")  # noqa: E251, E202
+
+    async def flush(self) -> None:
+        """Saves the counted views
+
+        Views of tags that were deleted are dropped. If the query fails, the views are
+        put back to be saved in the next flush, and the error is raised.
+        """
+        async with self.flush_lock:
+            views = self.pending
+            if not views:
+                return
+            self.pending = Counter()
+            try:
+                await self.bot.db.execute(
+                    """
+                    WITH new_views AS (
+                        SELECT *
+                        FROM UNNEST(
+                            $1::TIMESTAMPTZ[],
+                            $2::INT[],
+                            $3::BIGINT[],
+                            $4::BIGINT[],
+                            $5::INT[]
+                        ) AS v (hour, tag_id, server_id, viewer_id, views)
+                        WHERE EXISTS (
+                            SELECT 1
+                            FROM tags
+                            WHERE tags.id = v.tag_id
+                        )
+                    ),
+                    updated_tags AS (
+                        UPDATE tags
+                        SET views = COALESCE(tags.views, 0) + totals.views
+                        FROM (
+                            SELECT tag_id, SUM(views) AS views
+                            FROM new_views
+                            GROUP BY tag_id
+                        ) AS totals
+                        WHERE tags.id = totals.tag_id
+                    )
+                    INSERT INTO tag_view_rollups
+                    (hour, tag_id, server_id, viewer_id, views)
+                    SELECT hour, tag_id, server_id, viewer_id, views
+                    FROM new_views
+                    ON CONFLICT (tag_id, viewer_id, hour)
+                    DO UPDATE
+                    SET views = tag_view_rollups.views + EXCLUDED.views;
+                    """,
+                    [key[0] for key in views],
+                    [key[1] for key in views],
+                    [key[2] for key in views],
+                    [key[3] for key in views],
+                    list(views.values()),
+                )
+            except Exception:
+                self.pending.update(views)
+                raise
+            self.saved_count += sum(views.values())
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the counter's counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_tag_views_total counter",
+            f'parhelion_tag_views_total{{result="counted"}} {self.view_count}',
+            f'parhelion_tag_views_total{{result="saved"}} {self.saved_count}',
+            "# TYPE parhelion_tag_views_pending gauge",
+            f"parhelion_tag_views_pending {sum(self.pending.values())}",
+        ]
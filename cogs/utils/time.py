@@ -1,3 +1,6 @@
+import asyncio
+import time
+from collections import OrderedDict
 from datetime import datetime
 from datetime import timedelta
 
@@ -6,6 +9,7 @@ import dateparser  # https://pypi.org/project/dateparser/
 from discord.ext import commands  # https://pypi.org/project/discord.py/
 
 from cogs.utils.common import plural
+from cogs.utils.time_grammar import parse_time_fast
 
 
 async def create_relative_timestamp(dt: datetime) -> str:
@@ -104,13 +108,37 @@ async def parse_time_message(
     used. If the entire user_input is converted to a datetime, the second returned
     value will be an empty string. If a valid time description cannot be found,
     commands.BadArgument will be raised.
+
+    The most common kinds of time descriptions are parsed by `parse_time_fast`, and
+    only the rest are parsed by dateparser, which is much slower and so runs in the
+    bot's process pool.
     """
-    tz = await get_timezone(ctx.bot.db, ctx.author.id)
+    tz = await ctx.bot.timezone_cache.get(ctx.bot.db, ctx.author.id)
     if tz is None:
         tz = "UTC"
+    result = parse_time_fast(user_input, tz, to_timezone)
+    if result is None:
+        try:
+            result = await ctx.bot.process_pool.run(
+                parse_time_with_dateparser, user_input, tz, to_timezone
+            )
+        except asyncio.TimeoutError:
+            raise commands.BadArgument("That time description took too long to read.")
+    if result is None:
+        raise commands.BadArgument("Invalid time description")
+    return result
+
+
+def parse_time_with_dateparser(
+    user_input: str, timezone_name: str, to_timezone: str = "UTC"
+) -> tuple[datetime, str] | None:
+    """Parses a time description & optional message with dateparser
+
+    Returns None if no valid time description is at the front of user_input.
+    """
     # https://dateparser.readthedocs.io/en/latest/
     dateparser_settings = {
-        "TIMEZONE": str(tz),
+        "TIMEZONE": str(timezone_name),
         "TO_TIMEZONE": str(to_timezone),
         "RETURN_AS_TIMEZONE_AWARE": True,
         "PREFER_DATES_FROM": "future",
@@ -120,7 +148,6 @@ async def parse_time_message(
         split_input[:7]
     )  # The longest possible time description accepted is 7 words long.
     # Gradually try parsing fewer words until a valid time description is found.
-    message = ""
     for i in range(max_length, 0, -1):
         time_description = " ".join(split_input[:i])
         date_time = dateparser.parse(
@@ -128,10 +155,8 @@ async def parse_time_message(
         )
         if date_time is not None:
             message = user_input.replace(time_description, "")[1:]
-            break
-    if date_time is None:
-        raise commands.BadArgument("Invalid time description")
-    return date_time, message
+            return date_time, message
+    return None
 
 
 async def get_timezone(db: asyncpg.Pool, user_id: int) -> str | None:
@@ -144,3 +169,57 @@ async def get_timezone(db: asyncpg.Pool, user_id: int) -> str | None:
         """,
         user_id,
     )
+
+
+class TimezoneCache:
+    """An LRU cache of users' chosen timezones
+
+    Users without a timezone are cached too, so most commands that parse times do not
+    query the database. The `timezone` commands update the cache directly. Entries
+    expire after a while so that changes made through other clusters are picked up.
+    """
+
+    def __init__(self, *, ttl: float = 3600, max_size: int = 10_000) -> None:
+        """Creates a TimezoneCache object
+
+        Parameters
+        ----------
+        ttl : float
+            The number of seconds to cache a user's timezone or lack of one.
+        max_size : int
+            The number of users whose timezones to cache.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache: OrderedDict[int, tuple[float, str | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: asyncpg.Pool, user_id: int) -> str | None:
+        """Gets a user's chosen timezone, or None if they have not chosen one"""
+        cached = self.cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            self.cache.move_to_end(user_id)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        timezone = await get_timezone(db, user_id)
+        self.set(user_id, timezone)
+        return timezone
+
+    def set(self, user_id: int, timezone: str | None) -> None:
+        """Caches a user's timezone; use None if the user does not have one"""
+        self.cache[user_id] = (time.monotonic() + self.ttl, timezone)
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the cache's counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_timezone_cache_total counter",
+            f'parhelion_timezone_cache_total{{result="hit"}} {self.hits}',
+            f'parhelion_timezone_cache_total{{result="miss"}} {self.misses}',
+            "# TYPE parhelion_timezone_cache_size gauge",
+            f"parhelion_timezone_cache_size {len(self.cache)}",
+        ]
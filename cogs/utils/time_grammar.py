@@ -0,0 +1,240 @@
+import re
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import pytz  # https://pypi.org/project/pytz/
+
+
+# The fast path handles the time descriptions people type most often. Everything else
+# is left to dateparser. Words are separated by single spaces like in
+# `parse_time_message`, which splits the input on spaces.
+UNIT_SECONDS = {
+    "s": 1,
+    "sec": 1,
+    "secs": 1,
+    "second": 1,
+    "seconds": 1,
+    "m": 60,
+    "min": 60,
+    "mins": 60,
+    "minute": 60,
+    "minutes": 60,
+    "h": 3600,
+    "hr": 3600,
+    "hrs": 3600,
+    "hour": 3600,
+    "hours": 3600,
+    "d": 86400,
+    "day": 86400,
+    "days": 86400,
+    "w": 604800,
+    "week": 604800,
+    "weeks": 604800,
+}
+WEEKDAYS = {
+    "monday": 0,
+    "mon": 0,
+    "tuesday": 1,
+    "tues": 1,
+    "tue": 1,
+    "wednesday": 2,
+    "wed": 2,
+    "thursday": 3,
+    "thurs": 3,
+    "thur": 3,
+    "thu": 3,
+    "friday": 4,
+    "fri": 4,
+    "saturday": 5,
+    "sat": 5,
+    "sunday": 6,
+    "sun": 6,
+}
+UNIT = r"(?:seconds?|secs?|s|minutes?|mins?|m|hours?|hrs?|h|days?|d|weeks?|w)"
+WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+CLOCK = (
+    r"(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))? ?(?P<meridiem>[ap])\.?m\.?"
+    r"|(?P<hour24>\d{1,2}):(?P<minute24>\d{2}))"
+)
+END = r"(?= |$)"
+RELATIVE_REGEX = re.compile(
+    rf"in (?P<amounts>\d+ ?{UNIT}(?:(?:, | and | )\d+ ?{UNIT})*){END}", re.IGNORECASE
+)
+# dateparser reads forms like "2h30m" as a time of day (2:30 AM), but here they are
+# durations because that is what people mean by them.
+COMPACT_REGEX = re.compile(r"(?:in )?(?P<amounts>(?:\d+[smhdw])+)" + END, re.IGNORECASE)
+AMOUNT_REGEX = re.compile(rf"(\d+) ?({UNIT})", re.IGNORECASE)
+DAY_REGEX = re.compile(
+    rf"(?P<day>today|tomorrow|{WEEKDAY})(?: (?:at )?{CLOCK})?{END}", re.IGNORECASE
+)
+CLOCK_REGEX = re.compile(rf"(?:at )?{CLOCK}{END}", re.IGNORECASE)
+ISO_REGEX = re.compile(
+    r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})"
+    r"(?:[T ](?P<hour24>\d{2}):(?P<minute24>\d{2})(?::(?P<second>\d{2}))?)?" + END
+)
+MONTHS = (
+    "january jan february feb march mar april apr may june jun july jul august aug"
+    " september sept sep october oct november nov december dec"
+).split()
+# If the word after a match could continue the time description, such as in "tomorrow
+# at 3pm utc" or "in 5 minutes 30 seconds", dateparser might have used it, so the fast
+# path gives up.
+CONTINUATION_WORDS = {
+    *UNIT_SECONDS,
+    *WEEKDAYS,
+    *MONTHS,
+    *(
+        "and at on of in from ago next this last am pm a.m. p.m. noon midnight"
+        " morning afternoon evening night tonight today tomorrow yesterday utc gmt"
+        " month months year years"
+    ).split(),
+}
+NUMBER_REGEX = re.compile(r"[+-]?\d")
+
+
+def parse_time_fast(
+    user_input: str,
+    timezone_name: str = "UTC",
+    to_timezone: str = "UTC",
+    now: datetime | None = None,
+) -> tuple[datetime, str] | None:
+    """Parses the most common time descriptions without dateparser
+
+    Follows the same contract as `parse_time_message`: the time description must be at
+    the front of user_input, and the result is a timezone-aware datetime and the rest
+    of the input. Returns None if the input is not in one of the handled forms, in
+    which case dateparser should be used instead.
+
+    Parameters
+    ----------
+    user_input : str
+        A time description followed by an optional message.
+    timezone_name : str
+        The timezone that the user's input is in.
+    to_timezone : str
+        The timezone of the result.
+    now : datetime | None
+        The current time, for testing. Defaults to the real current time.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    tz = pytz.timezone(timezone_name)
+    result: datetime | None = None
+    if match := RELATIVE_REGEX.match(user_input) or COMPACT_REGEX.match(user_input):
+        seconds = sum(
+            int(amount) * UNIT_SECONDS[unit.lower()]
+            for amount, unit in AMOUNT_REGEX.findall(match["amounts"])
+        )
+        try:
+            result = now + timedelta(seconds=seconds)
+        except (OverflowError, ValueError):
+            return None  # Too far in the future; dateparser rejects it.
+    elif match := DAY_REGEX.match(user_input):
+        result = parse_day(match, tz, now.astimezone(tz))
+    elif match := CLOCK_REGEX.match(user_input):
+        result = parse_clock(match, tz, now.astimezone(tz))
+    elif match := ISO_REGEX.match(user_input):
+        result = parse_iso(match, tz)
+    if result is None or match is None:
+        return None
+    description = match[0]
+    if len(description.split(" ")) > 7:
+        return None  # `parse_time_message` tries at most 7 words.
+    message = user_input[len(description) + 1 :]
+    if could_continue(message.split(" ", 1)[0]):
+        return None
+    try:
+        return result.astimezone(pytz.timezone(to_timezone)), message
+    except (OverflowError, ValueError):
+        return None
+
+
+def could_continue(word: str) -> bool:
+    """Whether a word could be part of a time description"""
+    return bool(
+        NUMBER_REGEX.match(word) or word.lower().rstrip(",.") in CONTINUATION_WORDS
+    )
+
+
+def parse_day(
+    match: re.Match, tz: pytz.BaseTzInfo, local_now: datetime
+) -> datetime | None:
+    """Converts a match of DAY_REGEX to a datetime
+
+    Like dateparser, "today" and "tomorrow" without a time keep the current time of
+    day, and a weekday without a time means midnight. A weekday is always in the
+    future, so saying today's weekday means next week.
+    """
+    day_word = match["day"].lower()
+    if day_word == "today":
+        day = local_now.date()
+    elif day_word == "tomorrow":
+        day = local_now.date() + timedelta(days=1)
+    else:
+        days_ahead = (WEEKDAYS[day_word] - local_now.weekday()) % 7 or 7
+        day = local_now.date() + timedelta(days=days_ahead)
+    clock = get_clock(match)
+    if clock is None:
+        if match["hour"] is not None or match["hour24"] is not None:
+            return None  # The time is invalid.
+        if day_word in ("today", "tomorrow"):
+            naive = datetime.combine(day, local_now.time().replace(tzinfo=None))
+            return tz.localize(naive)
+        return tz.localize(datetime(day.year, day.month, day.day))
+    return localize(tz, day, *clock)
+
+
+def parse_clock(
+    match: re.Match, tz: pytz.BaseTzInfo, local_now: datetime
+) -> datetime | None:
+    """Converts a match of CLOCK_REGEX to the next time the clock shows that time"""
+    clock = get_clock(match)
+    if clock is None:
+        return None
+    result = localize(tz, local_now.date(), *clock)
+    if result < local_now:
+        result = localize(tz, local_now.date() + timedelta(days=1), *clock)
+    return result
+
+
+def parse_iso(match: re.Match, tz: pytz.BaseTzInfo) -> datetime | None:
+    """Converts a match of ISO_REGEX to a datetime, or None if the date is invalid"""
+    try:
+        naive = datetime(
+            int(match["year"]),
+            int(match["month"]),
+            int(match["day"]),
+            int(match["hour24"] or 0),
+            int(match["minute24"] or 0),
+            int(match["second"] or 0),
+        )
+    except ValueError:
+        return None
+    return tz.localize(naive)
+
+
+def get_clock(match: re.Match) -> tuple[int, int] | None:
+    """Gets the hour and minute of a match with a CLOCK group, if valid"""
+    if match["hour"] is not None:
+        hour = int(match["hour"])
+        minute = int(match["minute"] or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        hour %= 12
+        if match["meridiem"].lower() == "p":
+            hour += 12
+        return hour, minute
+    if match["hour24"] is not None:
+        hour = int(match["hour24"])
+        minute = int(match["minute24"])
+        if hour > 23 or minute > 59:
+            return None
+        return hour, minute
+    return None
+
+
+def localize(tz: pytz.BaseTzInfo, day: date, hour: int, minute: int) -> datetime:
+    """Creates a timezone-aware datetime from a date and a time of day"""
+    return tz.localize(datetime(day.year, day.month, day.day, hour, minute))
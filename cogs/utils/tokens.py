@@ -0,0 +1,107 @@
+import asyncio
+import re
+from collections import OrderedDict
+from typing import Awaitable
+from typing import Callable
+
+import discord  # https://pypi.org/project/discord.py/
+
+
+# Compiled once per process because every message the bot can see is scanned.
+TOKEN_REGEX = re.compile(
+    r"([a-zA-Z0-9]{24}\.[a-zA-Z0-9]{6}\.[a-zA-Z0-9_\-]{27}"
+    r"|mfa\.[a-zA-Z0-9_\-]{84})"
+)
+# The length of the shortest string the regex can match (24 + 1 + 6 + 1 + 27).
+MIN_TOKEN_LENGTH = 59
+
+
+class TokenScanner:
+    """Finds bot tokens in messages and publishes them in batches
+
+    Tokens that were already published recently are remembered in an LRU so that a
+    token spammed many times is only published once. Tokens found within a short
+    window of each other are published together with one call of `publish`.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[list[str], list[discord.Message]], Awaitable[None]],
+        *,
+        batch_window: float = 2.0,
+        lru_size: int = 1024,
+    ) -> None:
+        """Creates a TokenScanner object
+
+        Parameters
+        ----------
+        publish : Callable[[list[str], list[discord.Message]], Awaitable[None]]
+            A coroutine function that publishes a batch of tokens and responds to the
+            messages they were found in.
+        batch_window : float
+            The number of seconds to wait for more tokens before publishing a batch.
+        lru_size : int
+            The number of published tokens to remember.
+        """
+        self.publish = publish
+        self.batch_window = batch_window
+        self.lru_size = lru_size
+        self.published: OrderedDict[str, None] = OrderedDict()
+        self.pending_tokens: list[str] = []
+        self.pending_messages: list[discord.Message] = []
+        self.flush_task: asyncio.Task | None = None
+
+    def scan(self, content: str) -> list[str]:
+        """Returns the tokens in content that have not been published recently
+
+        Most messages are rejected by cheap length and separator checks before the
+        regex runs.
+        """
+        if len(content) < MIN_TOKEN_LENGTH or "." not in content:
+            return []
+        tokens: list[str] = []
+        for match in TOKEN_REGEX.finditer(content):
+            token = match[0]
+            if token in self.published:
+                self.published.move_to_end(token)
+            elif token not in tokens:
+                tokens.append(token)
+        return tokens
+
+    def add(self, tokens: list[str], message: discord.Message) -> None:
+        """Queues tokens found in a message to be published with the next batch"""
+        for token in tokens:
+            self.remember(token)
+            self.pending_tokens.append(token)
+        self.pending_messages.append(message)
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush_after_window())
+
+    def remember(self, token: str) -> None:
+        """Adds a token to the LRU of published tokens"""
+        self.published[token] = None
+        self.published.move_to_end(token)
+        while len(self.published) > self.lru_size:
+            self.published.popitem(last=False)
+
+    async def flush_after_window(self) -> None:
+        """Waits for the batch window to end and then publishes the batch
+
+        Tokens added while a batch is being published start another window, because
+        `add` does not start a task while this one is running.
+        """
+        while self.pending_messages:
+            await asyncio.sleep(self.batch_window)
+            await self.publish_pending()
+
+    async def publish_pending(self) -> None:
+        """Publishes the tokens waiting to be published"""
+        tokens, self.pending_tokens = self.pending_tokens, []
+        messages, self.pending_messages = self.pending_messages, []
+        try:
+            await self.publish(tokens, messages)
+        except Exception as error:
+            # Forget the tokens so they can be published if they are seen again.
+            for token in tokens:
+                self.published.pop(token, None)
+            print(f"  TokenScanner.publish_pending {error = }")  # noqa: E251, E202
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+from typing import Callable
+from typing import TypeVar
+
+
+Result = TypeVar("Result")
+
+
+def warm_up_worker() -> None:
+    """Imports the parsing libraries in a new worker process
+
+    Runs once in each worker when it starts so that the first job it gets does not
+    also pay for the imports and dateparser's language data.
+    """
+    import dateparser  # https://pypi.org/project/dateparser/
+    from bs4 import BeautifulSoup  # https://pypi.org/project/beautifulsoup4/
+
+    dateparser.parse("in 1 minute")
+    BeautifulSoup("<p>warm up</p>", features="lxml").get_text()
+
+
+class ProcessPool:
+    """Runs CPU-bound functions in worker processes so they do not block the event loop
+
+    The worker processes are started the first time the pool is used. If the pool is
+    disabled, cannot be started, or breaks, functions run in the event loop's thread
+    instead, so the features that use it keep working. A call that takes longer than
+    its timeout raises asyncio.TimeoutError, and the pool's workers are killed so that
+    the stuck one does not keep using CPU. The pool starts again the next time it is
+    used.
+    """
+
+    def __init__(self, *, max_workers: int = 2, timeout: float = 10) -> None:
+        """Creates a ProcessPool object
+
+        Parameters
+        ----------
+        max_workers : int
+            The number of worker processes. If 0, every function runs inline.
+        timeout : float
+            The default number of seconds to wait for a function to finish.
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.executor: ProcessPoolExecutor | None = None
+        self.submitted_count = 0
+        self.inline_count = 0
+        self.timeout_count = 0
+
+    async def run(
+        self,
+        function: Callable[..., Result],
+        *args: Any,
+        timeout: float | None = None,
+    ) -> Result:
+        """Calls function with args in a worker process and returns its result
+
+        The function and its arguments and result must be picklable, so the function
+        must be defined at the top level of a module.
+        """
+        executor = self.get_executor()
+        if executor is None:
+            self.inline_count += 1
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        self.submitted_count += 1
+        try:
+            future = loop.run_in_executor(executor, function, *args)
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeout_count += 1
+            self.kill()
+            raise
+        except BrokenProcessPool as error:
+            print(f"  ProcessPool.run {error = }")  # noqa: E251, E202
+            self.shutdown()
+            self.inline_count += 1
+            return function(*args)
+
+    def get_executor(self) -> ProcessPoolExecutor | None:
+        """Gets the executor, starting it if needed; returns None if it cannot run"""
+        if self.max_workers <= 0:
+            return None
+        if self.executor is None:
+            try:
+                # Forking a process that runs an event loop and threads is unsafe.
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm_up_worker,
+                )
+            except (OSError, NotImplementedError) as error:
+                print(f"  ProcessPool.get_executor {error = }")  # noqa: E251, E202
+                return None
+        return self.executor
+
+    def shutdown(self) -> None:
+        """Stops the worker processes without waiting; the pool restarts when used
+
+        Calls already submitted still finish in the old worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def kill(self) -> None:
+        """Kills the worker processes, including any stuck on a call
+
+        Other calls that were running or waiting in the pool raise BrokenProcessPool,
+        so `run` runs them inline instead. The pool restarts when used.
+        """
+        if self.executor is None:
+            return
+        # ProcessPoolExecutor has no public way to kill its workers before Python 3.14,
+        # and shutting it down clears this dict.
+        processes = list((self.executor._processes or dict()).values())
+        self.shutdown()
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the pool's counters in the Prometheus text format"""
+        return [
+            "# TYPE parhelion_process_pool_calls_total counter",
+            f'parhelion_process_pool_calls_total{{where="worker"}}'
+            f" {self.submitted_count}",
+            f'parhelion_process_pool_calls_total{{where="inline"}} {self.inline_count}',
+            "# TYPE parhelion_process_pool_timeouts_total counter",
+            f"parhelion_process_pool_timeouts_total {self.timeout_count}",
+        ]
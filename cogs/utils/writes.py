@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any
+from typing import Hashable
+
+
+class WriteBuffer:
+    """Collects low-value database writes in memory and saves them in batches
+
+    Each kind of write is registered with a name and a query. Writes are added with a
+    key, and a write replaces any unsaved write of the same kind with the same key, so
+    something written many times between flushes is only saved once. Each flush runs
+    each kind's query with `executemany`, which sends all its writes in one round trip.
+    Only use this for writes that can be lost in a crash without harm.
+    """
+
+    def __init__(self, bot, *, flush_interval: float = 5) -> None:
+        """Creates a WriteBuffer object
+
+        Parameters
+        ----------
+        bot
+            The bot.
+        flush_interval : float
+            The number of seconds between flushes.
+        """
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.queries: dict[str, str] = dict()
+        self.pending: dict[str, dict[Hashable, tuple[Any, ...]]] = dict()
+        self.flush_lock = asyncio.Lock()
+        self.write_count = 0
+        self.saved_count = 0
+
+    def register(self, name: str, query: str) -> None:
+        """Adds a kind of write
+
+        Parameters
+        ----------
+        name : str
+            The kind's name, used with `add`.
+        query : str
+            The query that saves one write. Its arguments are the ones given to `add`.
+        """
+        self.queries[name] = query
+        self.pending.setdefault(name, dict())
+
+    def add(self, name: str, key: Hashable, *args: Any) -> None:
+        """Saves a write to be run later, replacing any unsaved one with the same key"""
+        self.pending[name][key] = args
+        self.write_count += 1
+
+    async def run(self) -> None:
+        """A task that flushes the buffer periodically"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                print(f"  WriteBuffer.run {error = }")  # noqa: E251, E202
+
+    async def flush(self, *names: str) -> None:
+        """Saves the buffered writes of the given kinds, or of every kind if none given
+
+        If a query fails, its writes are put back (unless newer ones replaced them) to
+        be retried in the next flush, and the error is raised.
+        """
+        async with self.flush_lock:
+            for name in names or tuple(self.queries):
+                writes = self.pending[name]
+                if not writes:
+                    continue
+                self.pending[name] = dict()
+                try:
+                    await self.bot.db.executemany(
+                        self.queries[name], list(writes.values())
+                    )
+                except Exception:
+                    for key, args in writes.items():
+                        self.pending[name].setdefault(key, args)
+                    raise
+                self.saved_count += len(writes)
+
+    def render_prometheus(self) -> list[str]:
+        """Returns the buffer's counters in the Prometheus text format"""
+        pending_count = sum(len(writes) for writes in self.pending.values())
+        return [
+            "# TYPE parhelion_buffered_writes_total counter",
+            f'parhelion_buffered_writes_total{{result="added"}} {self.write_count}',
+            f'parhelion_buffered_writes_total{{result="saved"}} {self.saved_count}',
+            "# TYPE parhelion_buffered_writes_pending gauge",
+            f"parhelion_buffered_writes_pending {pending_count}",
+        ]
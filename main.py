@@ -1,23 +1,110 @@
 import asyncio
+import multiprocessing
 import os
+import time
 
 import asyncpg  # https://pypi.org/project/asyncpg/
 
 from bot import Bot
+from cogs.utils.migrations import run_migrations
+from cogs.utils.shards import fetch_recommended_shard_count
+from cogs.utils.shards import get_cluster_shard_ids
 
 
-async def main() -> None:
+# Discord allows one shard to identify every 5 seconds unless the bot has been given a
+# higher max_concurrency.
+IDENTIFY_INTERVAL = 5
+
+
+def launch() -> None:
+    """Runs the bot in this process, or in one process per cluster
+
+    If CLUSTER_COUNT is more than 1, the shards are split into that many contiguous
+    ranges and each range is run by its own process. All the processes share the same
+    database.
+    """
+    load_env()
+    cluster_count = int(os.environ.get("CLUSTER_COUNT", "1"))
+    if cluster_count <= 1 or "CLUSTER_ID" in os.environ:
+        asyncio.run(main())
+        return
+    if not os.environ.get("SHARD_COUNT"):
+        token = os.environ["DISCORD_BOT_TOKEN"]
+        shard_count = asyncio.run(fetch_recommended_shard_count(token))
+        os.environ["SHARD_COUNT"] = str(max(shard_count, cluster_count))
+    run_clusters(cluster_count, int(os.environ["SHARD_COUNT"]))
+
+
+def run_clusters(cluster_count: int, shard_count: int) -> None:
+    """Starts one process per cluster and restarts any that crash
+
+    The clusters are started one at a time so that their shards do not exceed
+    Discord's identify rate limit. This function returns once every cluster has exited
+    without an error. The owner-only `restart` command restarts only the cluster it is
+    used in.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes: dict[int, multiprocessing.process.BaseProcess] = dict()
+    for cluster_id in range(cluster_count):
+        processes[cluster_id] = start_cluster(context, cluster_id)
+        shard_ids = get_cluster_shard_ids(shard_count, cluster_count, cluster_id)
+        time.sleep(len(shard_ids) * IDENTIFY_INTERVAL)
+    try:
+        while processes:
+            time.sleep(IDENTIFY_INTERVAL)
+            for cluster_id, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                if process.exitcode == 0:
+                    print(f"Cluster {cluster_id} shut down.")
+                    del processes[cluster_id]
+                else:
+                    print(
+                        f"\x1b[31mCluster {cluster_id} exited with code"
+                        f" {process.exitcode}. Restarting it . . .\x1b[0m"
+                    )
+                    processes[cluster_id] = start_cluster(context, cluster_id)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+
+def start_cluster(context, cluster_id: int) -> multiprocessing.process.BaseProcess:
+    """Starts a process that runs one cluster's shards"""
+    process = context.Process(
+        target=run_cluster, args=(cluster_id,), name=f"cluster-{cluster_id}"
+    )
+    process.start()
+    return process
+
+
+def run_cluster(cluster_id: int) -> None:
+    """Runs one cluster; this is the entry point of each cluster's process"""
+    os.environ["CLUSTER_ID"] = str(cluster_id)
+    asyncio.run(main())
+
+
+def load_env() -> None:
+    """Loads the environment variables from .env unless running in Docker"""
     if os.environ.get("ENV") != "docker":
         from dotenv import load_dotenv  # https://pypi.org/project/python-dotenv/
 
         dotenv_path: str = ".env"
         abs_dotenv_path: str = os.path.join(os.path.dirname(__file__), dotenv_path)
         load_dotenv(abs_dotenv_path)
+
+
+async def main() -> None:
+    load_env()
     try:
         db: asyncpg.Pool = await get_db_connection()
     except Exception:
         print("\x1b[31mError: unable to connect to the database because:\x1b[0m")
         raise
+    for migration_name in await run_migrations(db):
+        print(f"Applied database migration {migration_name}")
     bot = Bot()
     bot.db = db
     token = os.environ["DISCORD_BOT_TOKEN"]
@@ -43,4 +130,4 @@ async def get_db_connection() -> asyncpg.Pool:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    launch()
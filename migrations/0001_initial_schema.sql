@@ -0,0 +1,92 @@
+-- The tables that the cogs used to create when they started. Every statement has
+-- IF NOT EXISTS so that this also works on databases created by those older versions.
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id SERIAL PRIMARY KEY,
+    author_id BIGINT NOT NULL,
+    start_time TIMESTAMPTZ NOT NULL,
+    target_time TIMESTAMPTZ NOT NULL,
+    message VARCHAR(500) NOT NULL,
+    is_dm BOOLEAN NOT NULL,
+    server_id BIGINT,
+    channel_id BIGINT,
+    jump_url TEXT,  -- The URL to the message that created the reminder.
+    UNIQUE (author_id, start_time)
+);
+
+-- Discord embed descriptions have a character limit of 4096 characters. Each note has a
+-- 500 character limit. The paginator in the notes command allows 7 notes in each embed.
+-- 7 * 500 = 3500, so there's some extra space for indexes, URLs, etc.
+CREATE TABLE IF NOT EXISTS notes (
+    author_id BIGINT PRIMARY KEY,
+    contents VARCHAR(500)[],
+    jump_urls TEXT[],  -- The URLs to the messages that created the notes.
+    -- This array is parallel to the contents array.
+    last_viewed_at TIMESTAMPTZ NOT NULL
+);
+
+-- Either parent_tag_id is NULL, or content and file_url are both NULL (though either
+-- content or file_url may be NULL regardless).
+CREATE TABLE IF NOT EXISTS tags (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    parent_tag_id INT,
+    content VARCHAR(1500),
+    file_url TEXT,
+    created TIMESTAMPTZ NOT NULL,
+    owner_id BIGINT NOT NULL,
+    server_id BIGINT NOT NULL,
+    views INT DEFAULT 0,
+    UNIQUE (name, server_id)
+);
+
+CREATE TABLE IF NOT EXISTS docs (
+    id SERIAL PRIMARY KEY,
+    server_id BIGINT UNIQUE,
+    url TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_quotes (
+    author_id BIGINT PRIMARY KEY,
+    start_time TIMESTAMPTZ NOT NULL,
+    target_time TIMESTAMPTZ NOT NULL,
+    is_dm BOOLEAN NOT NULL,
+    server_id BIGINT,
+    channel_id BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS timezones (
+    user_id BIGINT PRIMARY KEY NOT NULL,
+    timezone TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS prefixes (
+    id SERIAL PRIMARY KEY,
+    server_id BIGINT UNIQUE,
+    custom_prefixes TEXT[],
+    removed_default_prefixes TEXT[]
+);
+
+CREATE TABLE IF NOT EXISTS command_access_settings (
+    id SERIAL PRIMARY KEY,
+    cmd_name TEXT UNIQUE,
+    cmd_settings JSONB NOT NULL
+        DEFAULT '{
+            "global_users": {},
+            "global_servers": {},
+            "global": null,
+            "servers": {}
+        }'::jsonb
+);
+
+CREATE TABLE IF NOT EXISTS bot_access_settings (
+    -- This table should only ever have one row and one column.
+    -- Note its similarity to the table above.
+    bot_settings JSONB NOT NULL
+        DEFAULT '{
+            "global_users": {},
+            "global_servers": {},
+            "global": null,
+            "servers": {}
+        }'::jsonb
+);
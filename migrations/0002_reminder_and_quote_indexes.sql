@@ -0,0 +1,6 @@
+-- For loading reminders and daily quotes in order of when they are due.
+CREATE INDEX IF NOT EXISTS reminders_target_time_idx ON reminders (target_time);
+CREATE INDEX IF NOT EXISTS daily_quotes_target_time_idx ON daily_quotes (target_time);
+
+-- For listing, counting, and deleting a user's reminders.
+CREATE INDEX IF NOT EXISTS reminders_author_id_idx ON reminders (author_id);
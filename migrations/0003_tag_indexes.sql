@@ -0,0 +1,7 @@
+-- For finding tags by name, which is case-insensitive: the existing UNIQUE (name,
+-- server_id) constraint cannot be used for `LOWER(name) = LOWER($1)`.
+CREATE INDEX IF NOT EXISTS tags_server_id_lower_name_idx
+    ON tags (server_id, LOWER(name));
+
+-- For listing and counting a member's tags.
+CREATE INDEX IF NOT EXISTS tags_owner_id_idx ON tags (owner_id);
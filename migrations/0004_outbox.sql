@@ -0,0 +1,23 @@
+-- Scheduled messages (reminders and daily quotes) that are due and waiting to be sent.
+-- A row is deleted once its message is sent or can never be sent. Rows are sent in
+-- order of priority (lower first) and then of when they were due.
+CREATE TABLE IF NOT EXISTS outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,  -- "reminder" or "daily_quote".
+    priority SMALLINT NOT NULL DEFAULT 0,
+    due_time TIMESTAMPTZ NOT NULL,
+    next_attempt_at TIMESTAMPTZ NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    is_dm BOOLEAN NOT NULL,
+    destination_id BIGINT NOT NULL,  -- A user ID if is_dm, otherwise a channel ID.
+    server_id BIGINT NOT NULL DEFAULT 0,  -- 0 for DMs, like in the other tables.
+    content TEXT,
+    embed JSONB,
+    link_label TEXT,  -- The label and URL of an optional link button.
+    link_url TEXT,
+    last_error TEXT
+);
+
+-- For finding the rows that are ready to be sent.
+CREATE INDEX IF NOT EXISTS outbox_next_attempt_at_idx
+    ON outbox (next_attempt_at, priority, due_time);
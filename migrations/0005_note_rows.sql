@@ -0,0 +1,63 @@
+-- Each note in its own row, so that creating, editing, deleting, or swapping notes
+-- changes only the rows involved instead of rewriting every note the user has. The
+-- notes table keeps one row per user for last_viewed_at. Its contents and jump_urls
+-- arrays are no longer read or written by the bot but are kept so that an older
+-- version of the bot still works during a rolling restart; a later migration will drop
+-- them.
+CREATE TABLE IF NOT EXISTS note_rows (
+    id BIGSERIAL PRIMARY KEY,
+    author_id BIGINT NOT NULL,
+    -- Sorts the user's notes. There may be gaps, so the index the notes command shows
+    -- for a note is its rank among the user's notes, not its position.
+    position INT NOT NULL,
+    content VARCHAR(500) NOT NULL,
+    jump_url TEXT NOT NULL DEFAULT '',  -- The URL to the message that created it.
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- Deferrable so that a statement that swaps two positions is checked after the
+    -- whole statement instead of after each row.
+    CONSTRAINT note_rows_author_id_position_key
+        UNIQUE (author_id, position) DEFERRABLE INITIALLY IMMEDIATE
+);
+
+-- Copy the notes from the arrays.
+INSERT INTO note_rows
+(author_id, position, content, jump_url)
+SELECT n.author_id, u.position, u.content, COALESCE(u.jump_url, '')
+FROM notes AS n,
+    UNNEST(n.contents, n.jump_urls) WITH ORDINALITY AS u (content, jump_url, position)
+WHERE u.content IS NOT NULL;
+
+-- Until the arrays are dropped, copy any array writes an older version of the bot
+-- makes during a rolling restart. The older version deletes a user's notes row when
+-- they delete their last note.
+CREATE OR REPLACE FUNCTION copy_note_arrays_to_rows() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM note_rows
+        WHERE author_id = OLD.author_id;
+        RETURN NULL;
+    END IF;
+    DELETE FROM note_rows
+    WHERE author_id = NEW.author_id;
+    INSERT INTO note_rows
+    (author_id, position, content, jump_url)
+    SELECT NEW.author_id, u.position, u.content, COALESCE(u.jump_url, '')
+    FROM UNNEST(NEW.contents, NEW.jump_urls)
+        WITH ORDINALITY AS u (content, jump_url, position)
+    WHERE u.content IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notes_copy_arrays_to_rows ON notes;
+CREATE TRIGGER notes_copy_arrays_to_rows
+    AFTER INSERT OR UPDATE OF contents, jump_urls ON notes
+    FOR EACH ROW
+    WHEN (NEW.contents IS NOT NULL)
+    EXECUTE FUNCTION copy_note_arrays_to_rows();
+
+DROP TRIGGER IF EXISTS notes_delete_rows ON notes;
+CREATE TRIGGER notes_delete_rows
+    AFTER DELETE ON notes
+    FOR EACH ROW
+    EXECUTE FUNCTION copy_note_arrays_to_rows();
@@ -0,0 +1,4 @@
+-- For the `notes search` command. The query must use the same expression,
+-- `to_tsvector('english', content)`, for this index to be used.
+CREATE INDEX IF NOT EXISTS note_rows_content_search_idx
+    ON note_rows USING GIN (to_tsvector('english', content));
@@ -0,0 +1,15 @@
+-- Tag views per hour, tag, and viewer, for the `tag stats` commands. The bot counts
+-- views in memory and adds them to this table and to tags.views in batches, so some
+-- recent views may not be saved yet. A tag's rows are deleted with the tag.
+CREATE TABLE IF NOT EXISTS tag_view_rollups (
+    hour TIMESTAMPTZ NOT NULL,  -- The start of the hour the views happened in.
+    tag_id INT NOT NULL REFERENCES tags (id) ON DELETE CASCADE,
+    server_id BIGINT NOT NULL,
+    viewer_id BIGINT NOT NULL,
+    views INT NOT NULL,
+    PRIMARY KEY (tag_id, viewer_id, hour)
+);
+
+-- For the statistics of a server and its members over a recent time span.
+CREATE INDEX IF NOT EXISTS tag_view_rollups_server_id_hour_idx
+    ON tag_view_rollups (server_id, hour);
@@ -0,0 +1,124 @@
+"""Checks that the migrations apply to a database that has data from before them
+
+The script creates a scratch database, applies the migrations before the notes were
+moved into their own rows, saves notes the way older versions of the bot did, applies
+the rest of the migrations, and checks that every note was copied. The scratch
+database is dropped afterwards, and the script exits with status 1 if anything is
+wrong. Run it from the repository's root folder with the bot's requirements installed
+and the same POSTGRES_ environment variables as the bot; the user must be allowed to
+create databases:
+
+    python -m scripts.check_migrations
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+from datetime import timezone
+
+import asyncpg  # https://pypi.org/project/asyncpg/
+
+from cogs.utils.migrations import find_migrations
+from cogs.utils.migrations import run_migrations
+from main import load_env
+
+
+SCRATCH_DATABASE_NAME = "parhelion_migration_check"
+NOTE_ROWS_VERSION = 5
+
+# Each author's notes as older versions of the bot saved them, in parallel arrays.
+LEGACY_NOTES = {
+    1: (
+        ["buy milk", "call back", "water the plants"],
+        ["https://a", None, "https://c"],
+    ),
+    2: (["only note"], ["https://d"]),
+    3: (["before a gap", None, "after a gap"], ["https://e", None, None]),
+}
+
+
+def get_connection_options(database: str) -> dict[str, str | None]:
+    """Gets the options to connect to a database on the bot's PostgreSQL server"""
+    return dict(
+        host=os.environ.get("POSTGRES_HOST", "localhost"),
+        database=database,
+        port=os.environ.get("POSTGRES_PORT", "5432"),
+        user=os.environ.get("POSTGRES_USER", "postgres"),
+        password=os.environ.get("POSTGRES_PASSWORD"),
+    )
+
+
+async def check_migrations(db: asyncpg.Pool) -> list[str]:
+    """Migrates an empty database with legacy data in it; returns any problems"""
+    with tempfile.TemporaryDirectory() as folder_path:
+        for version, path in find_migrations():
+            if version < NOTE_ROWS_VERSION:
+                os.symlink(path, os.path.join(folder_path, os.path.basename(path)))
+        await run_migrations(db, folder_path)
+    now = datetime.now(timezone.utc)
+    for author_id, (contents, jump_urls) in LEGACY_NOTES.items():
+        await db.execute(
+            """
+            INSERT INTO notes
+            (author_id, contents, jump_urls, last_viewed_at)
+            VALUES ($1, $2, $3, $4);
+            """,
+            author_id,
+            contents,
+            jump_urls,
+            now,
+        )
+    try:
+        await run_migrations(db)
+    except asyncpg.PostgresError as error:
+        return [f"the migrations failed: {error!r}"]
+    problems: list[str] = []
+    for author_id, (contents, jump_urls) in LEGACY_NOTES.items():
+        records = await db.fetch(
+            """
+            SELECT content, jump_url
+            FROM note_rows
+            WHERE author_id = $1
+            ORDER BY position;
+            """,
+            author_id,
+        )
+        expected = [
+            (content, jump_url or "")
+            for content, jump_url in zip(contents, jump_urls)
+            if content is not None
+        ]
+        actual = [(r["content"], r["jump_url"]) for r in records]
+        if actual != expected:
+            problems.append(f"author {author_id}'s notes are {actual}, not {expected}")
+    return problems
+
+
+async def main() -> int:
+    load_env()
+    maintenance_database = os.environ.get("POSTGRES_DB", "postgres")
+    conn = await asyncpg.connect(**get_connection_options(maintenance_database))
+    try:
+        await conn.execute(f"DROP DATABASE IF EXISTS {SCRATCH_DATABASE_NAME};")
+        await conn.execute(f"CREATE DATABASE {SCRATCH_DATABASE_NAME};")
+        try:
+            db = await asyncpg.create_pool(
+                **get_connection_options(SCRATCH_DATABASE_NAME)
+            )
+            try:
+                problems = await check_migrations(db)
+            finally:
+                await db.close()
+        finally:
+            await conn.execute(f"DROP DATABASE IF EXISTS {SCRATCH_DATABASE_NAME};")
+    finally:
+        await conn.close()
+    for problem in problems:
+        print(f"Problem: {problem}")
+    print("The migrations work." if not problems else f"{len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
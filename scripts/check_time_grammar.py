@@ -0,0 +1,105 @@
+"""Checks the fast time parser against dateparser and times both
+
+Each phrase in the corpus is parsed both ways in UTC, and the script exits with status
+1 if any results differ. Run it from the repository's root folder with the bot's
+requirements installed:
+
+    python -m scripts.check_time_grammar
+"""
+import sys
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from statistics import mean
+
+from cogs.utils.time import parse_time_with_dateparser
+from cogs.utils.time_grammar import parse_time_fast
+
+
+# Time descriptions the fast path handles, each followed by a message. Forms where the
+# fast path deliberately differs from dateparser, such as "2h30m", are not included. In
+# other timezones, dateparser sometimes uses the UTC date instead of the user's date,
+# which the fast path does not copy.
+TIME_GRAMMAR_CORPUS = [
+    "in 5 minutes take out the trash",
+    "in 1 hour check the oven",
+    "in 2 hours and 30 minutes leave for the airport",
+    "in 1 hour, 15 minutes call back",
+    "in 45 seconds",
+    "in 3 days renew the library books",
+    "in 2 weeks dentist",
+    "in 10 mins stretch",
+    "2h stretch",
+    "in 90m laundry",
+    "15m tea",
+    "1d12h package arrives",
+    "tomorrow water the plants",
+    "tomorrow at 3pm call mom",
+    "tomorrow 9:30am standup",
+    "tomorrow at 17:45 gym",
+    "today at 11pm go to bed",
+    "at 3pm pick up the kids",
+    "7:15 am wake up",
+    "12pm lunch",
+    "18:00 dinner",
+    "friday submit the report",
+    "friday at 5pm happy hour",
+    "mon 9am planning",
+    "sunday at 10:30 brunch",
+    "2030-01-01 happy new year",
+    "2030-06-15 14:00 wedding",
+    "2030-06-15T08:05 flight",
+]
+
+
+def check_time_grammar(
+    fast_repetitions: int = 1000, slow_repetitions: int = 10
+) -> list[tuple[str, bool, float, float]]:
+    """Compares `parse_time_fast` with dateparser on the corpus
+
+    Returns each phrase, whether both parsers gave the same result in UTC, and the mean
+    microseconds each parser took. Relative times may differ by a few seconds because
+    the parsers do not run at the same moment.
+    """
+    results: list[tuple[str, bool, float, float]] = []
+    for phrase in TIME_GRAMMAR_CORPUS:
+        now = datetime.now(timezone.utc)
+        fast_result = parse_time_fast(phrase, now=now)
+        slow_result = parse_time_with_dateparser(phrase, "UTC")
+        same = (
+            fast_result is not None
+            and slow_result is not None
+            and abs(fast_result[0] - slow_result[0]) < timedelta(seconds=5)
+            and fast_result[1] == slow_result[1]
+        )
+        start = time.perf_counter()
+        for _ in range(fast_repetitions):
+            parse_time_fast(phrase)
+        fast_us = (time.perf_counter() - start) / fast_repetitions * 1_000_000
+        start = time.perf_counter()
+        for _ in range(slow_repetitions):
+            parse_time_with_dateparser(phrase, "UTC")
+        slow_us = (time.perf_counter() - start) / slow_repetitions * 1_000_000
+        results.append((phrase, same, fast_us, slow_us))
+    return results
+
+
+def main() -> int:
+    results = check_time_grammar()
+    for phrase, same, fast_us, slow_us in results:
+        print(
+            f"{'ok' if same else 'DIFFERENT'} {phrase!r}:"
+            f" {fast_us:.1f} µs vs {slow_us / 1000:.1f} ms"
+        )
+    mismatch_count = sum(not same for _, same, _, _ in results)
+    print(
+        f"{mismatch_count} of {len(results)} phrases differ;"
+        f" mean fast: {mean(r[2] for r in results):.1f} µs,"
+        f" mean dateparser: {mean(r[3] for r in results) / 1000:.1f} ms"
+    )
+    return 1 if mismatch_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())